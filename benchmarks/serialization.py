@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Benchmark of the serialization of a list of preservation infos.
+
+Compares ``PreservationInfoSchema.dump`` with the function compiled by
+``compile_dump``, which ``PreservationInfoList.hits`` uses for each row.
+
+Usage:
+
+.. code-block:: console
+
+    $ python benchmarks/serialization.py --rows 10000
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from invenio_preservation_sync.models import PreservationInfoModel, PreservationStatus
+from invenio_preservation_sync.services.schemas import (
+    PreservationInfoSchema,
+    compile_dump,
+)
+
+
+def build(rows):
+    """Return ``rows`` transient preservation infos of a single record."""
+    object_uuid = uuid.uuid4()
+    start = datetime(2024, 1, 1)
+    return [
+        PreservationInfoModel(
+            id=uuid.uuid4(),
+            object_uuid=object_uuid,
+            revision_id=i,
+            status=PreservationStatus.PRESERVED,
+            harvest_timestamp=start + timedelta(minutes=i),
+            archive_timestamp=start + timedelta(minutes=i, seconds=30),
+            uri=f"https://archive.org/{object_uuid}/{i}",
+            path=f"/{object_uuid}/{i}",
+            description={"sip": {"files": i % 7}},
+            event_id=uuid.uuid4(),
+        )
+        for i in range(rows)
+    ]
+
+
+def measure(dump, objs, repeat):
+    """Return the median time in milliseconds to dump all the objects."""
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        for obj in objs:
+            dump(obj)
+        timings.append((time.perf_counter() - begin) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    schema = PreservationInfoSchema()
+    objs = build(args.rows)
+    compiled = compile_dump(schema)
+    assert all(compiled(obj) == schema.dump(obj) for obj in objs)
+
+    before = measure(schema.dump, objs, args.repeat)
+    after = measure(compiled, objs, args.repeat)
+
+    print(f"{args.rows} rows")
+    print(f"marshmallow schema: {before:8.3f} ms (median)")
+    print(f"compiled dump:      {after:8.3f} ms (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#
+# This file is part of Invenio.
+# Copyright (C) 2024 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Add description GIN index on Preservation Info."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20b0395b4f39"
+down_revision = "c8d77ef00486"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    # Only PostgreSQL stores the description as JSONB
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_index(
+            "ix_preservation_info_description",
+            "preservation_info",
+            ["description"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"description": "jsonb_path_ops"},
+        )
+
+
+def downgrade():
+    """Downgrade database."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index(
+            "ix_preservation_info_description", table_name="preservation_info"
+        )
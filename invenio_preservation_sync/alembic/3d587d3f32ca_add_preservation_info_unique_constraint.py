@@ -0,0 +1,67 @@
+#
+# This file is part of Invenio.
+# Copyright (C) 2024 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Add unique constraint on Preservation Info."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3d587d3f32ca"
+down_revision = "a1479394af66"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    if op.get_bind().dialect.name == "postgresql":
+        # Keep only the newest of the duplicated preservation infos
+        op.execute(
+            """
+            DELETE FROM preservation_info AS older
+            USING preservation_info AS newer
+            WHERE older.object_uuid = newer.object_uuid
+                AND older.revision_id = newer.revision_id
+                AND older.archive_timestamp = newer.archive_timestamp
+                AND (older.created, older.id) < (newer.created, newer.id)
+            """
+        )
+        # The deletion cascades to the latest preservation infos pointing to the
+        # deleted duplicates, point these records to their remaining latest one
+        op.execute(
+            """
+            INSERT INTO preservation_info_latest (object_uuid, preservation_id)
+            SELECT object_uuid, id FROM (
+                SELECT
+                    object_uuid,
+                    id,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY object_uuid
+                        ORDER BY created DESC, revision_id DESC, archive_timestamp DESC
+                    ) AS row_num
+                FROM preservation_info
+                WHERE object_uuid NOT IN (
+                    SELECT object_uuid FROM preservation_info_latest
+                )
+            ) AS ranked
+            WHERE row_num = 1
+            """
+        )
+    op.create_unique_constraint(
+        op.f("uq_preservation_info_object_uuid"),
+        "preservation_info",
+        ["object_uuid", "revision_id", "archive_timestamp"],
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_constraint(
+        op.f("uq_preservation_info_object_uuid"),
+        "preservation_info",
+        type_="unique",
+    )
@@ -0,0 +1,40 @@
+#
+# This file is part of Invenio.
+# Copyright (C) 2024 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Add indexes matching the search ordering of Preservation Info."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "793ba634edb4"
+down_revision = "3d587d3f32ca"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_index(
+        "ix_preservation_info_created_id",
+        "preservation_info",
+        ["created", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_preservation_info_status_created_id",
+        "preservation_info",
+        ["status", "created", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index(
+        "ix_preservation_info_status_created_id", table_name="preservation_info"
+    )
+    op.drop_index("ix_preservation_info_created_id", table_name="preservation_info")
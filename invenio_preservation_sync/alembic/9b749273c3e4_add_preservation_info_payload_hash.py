@@ -0,0 +1,30 @@
+#
+# This file is part of Invenio.
+# Copyright (C) 2024 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Add payload fingerprint column on Preservation Info."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b749273c3e4"
+down_revision = "20b0395b4f39"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.add_column(
+        "preservation_info",
+        sa.Column("payload_hash", sa.String(length=64), nullable=True),
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_column("preservation_info", "payload_hash")
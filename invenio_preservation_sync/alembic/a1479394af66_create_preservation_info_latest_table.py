@@ -0,0 +1,71 @@
+#
+# This file is part of Invenio.
+# Copyright (C) 2024 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Create latest Preservation Info table."""
+
+import sqlalchemy as sa
+import sqlalchemy_utils
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a1479394af66"
+down_revision = "aaf9be021485"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        "preservation_info_latest",
+        sa.Column(
+            "object_uuid", sqlalchemy_utils.types.uuid.UUIDType(), nullable=False
+        ),
+        sa.Column(
+            "preservation_id", sqlalchemy_utils.types.uuid.UUIDType(), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["preservation_id"],
+            ["preservation_info.id"],
+            name=op.f("fk_preservation_info_latest_preservation_id_preservation_info"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint(
+            "object_uuid", name=op.f("pk_preservation_info_latest")
+        ),
+    )
+    op.create_index(
+        op.f("ix_preservation_info_latest_preservation_id"),
+        "preservation_info_latest",
+        ["preservation_id"],
+        unique=False,
+    )
+    op.execute(
+        """
+        INSERT INTO preservation_info_latest (object_uuid, preservation_id)
+        SELECT object_uuid, id FROM (
+            SELECT
+                object_uuid,
+                id,
+                ROW_NUMBER() OVER (
+                    PARTITION BY object_uuid
+                    ORDER BY created DESC, revision_id DESC, archive_timestamp DESC
+                ) AS row_num
+            FROM preservation_info
+        ) AS ranked
+        WHERE row_num = 1
+        """
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index(
+        op.f("ix_preservation_info_latest_preservation_id"),
+        table_name="preservation_info_latest",
+    )
+    op.drop_table("preservation_info_latest")
@@ -0,0 +1,43 @@
+#
+# This file is part of Invenio.
+# Copyright (C) 2024 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Add index for the latest Preservation Info lookup."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "aaf9be021485"
+down_revision = "2e6fbe6998cc"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_index(
+        "ix_preservation_info_object_uuid_created",
+        "preservation_info",
+        ["object_uuid", "created", "revision_id", "archive_timestamp"],
+        unique=False,
+    )
+    # Redundant with the prefix of the composite index
+    op.drop_index(
+        op.f("ix_preservation_info_object_uuid"), table_name="preservation_info"
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.create_index(
+        op.f("ix_preservation_info_object_uuid"),
+        "preservation_info",
+        ["object_uuid"],
+        unique=False,
+    )
+    op.drop_index(
+        "ix_preservation_info_object_uuid_created", table_name="preservation_info"
+    )
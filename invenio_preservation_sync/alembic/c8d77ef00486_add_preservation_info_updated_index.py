@@ -0,0 +1,31 @@
+#
+# This file is part of Invenio.
+# Copyright (C) 2024 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Add change feed index on Preservation Info."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c8d77ef00486"
+down_revision = "793ba634edb4"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_index(
+        "ix_preservation_info_updated_id",
+        "preservation_info",
+        ["updated", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index("ix_preservation_info_updated_id", table_name="preservation_info")
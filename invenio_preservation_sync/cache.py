@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""In-memory caches for Preservation Sync module."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """Bounded in-memory cache with LRU eviction and per-entry expiry.
+
+    It implements the ``get``/``set``/``add``/``delete``/``clear`` subset of
+    the Flask-Caching backend API, so a shared cache can be used in its place.
+    """
+
+    def __init__(self, maxsize=1024, default_timeout=300):
+        """Constructor.
+
+        :param maxsize: Maximum number of entries kept in the cache.
+        :param default_timeout: Seconds before an entry expires, ``0`` or
+            ``None`` to never expire.
+        """
+        self.maxsize = maxsize
+        self.default_timeout = default_timeout
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for the key or ``None`` on a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, timeout=None):
+        """Cache a value, evicting the least recently used entry if full."""
+        timeout = self.default_timeout if timeout is None else timeout
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def add(self, key, value, timeout=None):
+        """Cache a value only if the key is not cached yet.
+
+        :returns: Whether the value was cached.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                return False
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        """Remove a key from the cache."""
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+        return True
+
+    def __len__(self):
+        """Return the number of cached entries."""
+        return len(self._data)
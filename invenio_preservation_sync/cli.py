@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Command line interface for Preservation Sync module."""
+
+import gzip
+from contextlib import nullcontext
+
+import click
+from flask.cli import with_appcontext
+from invenio_access.permissions import system_identity
+from invenio_db import db
+
+from .models import PreservationInfoLatestModel, PreservationStatus
+from .proxies import current_preservation_sync_service
+from .tasks import compact as compact_preservations
+
+
+@click.group()
+def preservation_sync():
+    """Preservation Sync commands."""
+
+
+@preservation_sync.command("rebuild-latest")
+@click.option(
+    "--batch-size",
+    default=1000,
+    show_default=True,
+    help="Number of records processed per transaction.",
+)
+@with_appcontext
+def rebuild_latest(batch_size):
+    """Rebuild the latest preservation info of every record."""
+    total = 0
+    for object_uuids in PreservationInfoLatestModel.rebuild(batch_size=batch_size):
+        db.session.commit()
+        current_preservation_sync_service.forget_missing(object_uuids)
+        total += len(object_uuids)
+        click.echo(f"Processed {total} records.")
+    click.secho(f"Rebuilt the latest preservation info of {total} records.", fg="green")
+
+
+@preservation_sync.command("compact")
+@click.option(
+    "--age",
+    type=click.IntRange(min=0),
+    help="Days after which superseded preservation infos are deleted "
+    "[default: PRESERVATION_SYNC_COMPACTION_AGE].",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    help="Number of preservation infos deleted per transaction "
+    "[default: PRESERVATION_SYNC_COMPACTION_BATCH_SIZE].",
+)
+@with_appcontext
+def compact(age, batch_size):
+    """Delete the superseded processing and failed preservation infos.
+
+    The latest preservation info of each record revision is always kept.
+    """
+    preservations = events = 0
+    for deleted_preservations, deleted_events in compact_preservations(age, batch_size):
+        preservations += deleted_preservations
+        events += deleted_events
+        click.echo(f"Deleted {preservations} preservation infos.")
+    click.secho(
+        f"Deleted {preservations} preservation infos and {events} events.",
+        fg="green",
+    )
+
+
+@preservation_sync.command("export")
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, writable=True, allow_dash=True),
+    default="-",
+    show_default=True,
+    help="File to write the newline delimited JSON to.",
+)
+@click.option("--gzip", "compress", is_flag=True, help="Compress the output.")
+@click.option(
+    "--status",
+    "-s",
+    multiple=True,
+    type=click.Choice([status.value for status in PreservationStatus]),
+    help="Only export the preservations with this status, can be repeated.",
+)
+@click.option("--created-from", type=click.DateTime(), help="Created on or after.")
+@click.option("--created-to", type=click.DateTime(), help="Created before.")
+@click.option("--archived-from", type=click.DateTime(), help="Archived on or after.")
+@click.option("--archived-to", type=click.DateTime(), help="Archived before.")
+@with_appcontext
+def export(output, compress, **filters):
+    """Export the preservation infos as newline delimited JSON.
+
+    The dates are in UTC.
+    """
+    lines = current_preservation_sync_service.export(system_identity, **filters)
+    with click.open_file(output, "wb") as stream:
+        if compress:
+            stream = gzip.GzipFile(fileobj=stream, mode="wb")
+        with stream if compress else nullcontext(stream):
+            for line in lines:
+                stream.write(line.encode())
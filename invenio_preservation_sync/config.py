@@ -17,9 +17,155 @@ PRESERVATION_SYNC_GET_LIST_PATH = "/records/<pid_id>/preservations"
 PRESERVATION_SYNC_GET_LATEST_PATH = "/records/<pid_id>/preservations/latest"
 """API path to get the latest preservation status."""
 
+PRESERVATION_SYNC_DEFAULT_PAGE_SIZE = 25
+"""Default number of preservation infos returned per page."""
+
+PRESERVATION_SYNC_MAX_PAGE_SIZE = 100
+"""Maximum number of preservation infos that can be requested per page."""
+
+PRESERVATION_SYNC_BATCH_MAX_SIZE = 1000
+"""Maximum number of preservation payloads accepted in a single batch event."""
+
+PRESERVATION_SYNC_ASYNC = False
+"""Process the preservation events in a Celery task instead of during the request.
+
+The events are acknowledged with a 202 as soon as they are stored, and their
+outcome is written back to the event, see ``GET /hooks/receivers/preservation/events/<event_id>``.
+"""
+
+PRESERVATION_SYNC_ASYNC_SHARDS = 1
+"""Number of Celery queues the events are sharded across in async mode.
+
+The events of a record always go to the same ``<PRESERVATION_SYNC_ASYNC_QUEUE>.<n>``
+queue, so that with a single worker process per queue they are applied in order
+while the events of different records are processed in parallel, e.g.:
+
+.. code-block:: console
+
+    $ celery -A invenio_app.celery worker -Q preservation-sync.0 --concurrency 1
+
+A batch event is split by the queue of the record of each item, with one task
+per queue processing its items. With ``1`` the events are sent to the default
+queue.
+"""
+
+PRESERVATION_SYNC_ASYNC_QUEUE = "preservation-sync"
+"""Prefix of the Celery queues the events are sharded across."""
+
+PRESERVATION_SYNC_WRITE_BUFFER_SIZE = 0
+"""Maximum number of preservation events written in one transaction.
+
+Above ``1``, the single preservation events received at the same time by a
+process are buffered and committed together, once this many are pending or
+after ``PRESERVATION_SYNC_WRITE_BUFFER_DELAY``. Each request is answered after
+its event is committed. It can't exceed ``PRESERVATION_SYNC_BATCH_MAX_SIZE``.
+"""
+
+PRESERVATION_SYNC_WRITE_BUFFER_DELAY = 10
+"""Milliseconds a buffered preservation event waits for others before being written."""
+
+PRESERVATION_SYNC_WRITE_BUFFER_TIMEOUT = 30
+"""Seconds a request waits for its buffered preservation event to be written.
+
+Past it, the request is answered with a 503 so that it can be retried.
+"""
+
+PRESERVATION_SYNC_EXPORT_BATCH_SIZE = 1000
+"""Number of preservation infos fetched from the database at a time by the export."""
+
+PRESERVATION_SYNC_CHANGES_DELAY = 5
+"""Seconds before a change is returned by the change feed.
+
+Leaves time for the transactions that were writing at the same time to commit,
+so that a consumer following the cursor does not skip their changes.
+"""
+
 PRESERVATION_SYNC_PID_RESOLVER = None
 """Function to resolve the pid to the object uuid. Raise PIDDoesNotExistError if cannot be done."""
 
+PRESERVATION_SYNC_PID_BATCH_RESOLVER = None
+"""Function to resolve a list of pids at once, returning a dict of pid to object uuid.
+
+Pids that cannot be resolved are left out of the dict. When not set, each pid is
+resolved with :data:`PRESERVATION_SYNC_PID_RESOLVER`.
+"""
+
+PRESERVATION_SYNC_PID_CACHE_SIZE = 10000
+"""Maximum number of resolved pids kept in memory, ``0`` to disable the cache."""
+
+PRESERVATION_SYNC_PID_CACHE_TTL = 3600
+"""Seconds a resolved pid is kept in the cache."""
+
+PRESERVATION_SYNC_PID_CACHE_NEGATIVE_TTL = 60
+"""Seconds a pid that could not be resolved is kept in the cache."""
+
+PRESERVATION_SYNC_RENDER_CACHE = None
+"""Cache for the latest preservation status shown on record landing pages.
+
+Any object (or import string) implementing the Flask-Caching ``get``, ``set`` and
+``delete`` methods can be used, e.g. ``invenio_cache.proxies.current_cache``. A
+shared cache is needed for the writes of a process, e.g. another web worker or
+the Celery workers in async mode, to invalidate the entries of the others. By
+default an in-memory cache of each process is used, so the landing pages served
+by the other processes can show a stale status for up to
+``PRESERVATION_SYNC_RENDER_CACHE_TTL``.
+"""
+
+PRESERVATION_SYNC_RENDER_CACHE_SIZE = 10000
+"""Maximum number of records kept in the default in-memory render cache, ``0`` to disable it."""
+
+PRESERVATION_SYNC_RENDER_CACHE_TTL = 300
+"""Seconds the latest preservation status of a record is kept in the render cache."""
+
+PRESERVATION_SYNC_MISSING_CACHE = None
+"""Cache of the records without preservation info, which ``/latest`` answers with a 404.
+
+Any object (or import string) implementing the Flask-Caching ``get``, ``set`` and
+``delete`` methods can be used, e.g. ``invenio_cache.proxies.current_cache``. A
+shared cache is needed for the writes of a process, e.g. the Celery workers in
+async mode, to invalidate the entries of the others. By default an in-memory
+cache of each process is used, whose entries only expire after
+``PRESERVATION_SYNC_MISSING_CACHE_TTL`` in the other processes.
+"""
+
+PRESERVATION_SYNC_MISSING_CACHE_SIZE = 10000
+"""Maximum number of records kept in the default in-memory missing cache, ``0`` to disable it."""
+
+PRESERVATION_SYNC_MISSING_CACHE_TTL = 60
+"""Seconds a record without preservation info is remembered as such."""
+
+PRESERVATION_SYNC_STATS_CACHE_TTL = 60
+"""Seconds the preservation statistics are cached, ``0`` to disable the cache."""
+
+PRESERVATION_SYNC_IDEMPOTENCY_CACHE = None
+"""Store of the responses of the events sent with an idempotency key.
+
+Any object (or import string) implementing the Flask-Caching ``get``, ``set``,
+``add`` and ``delete`` methods can be used, e.g.
+``invenio_cache.proxies.current_cache`` to share it between processes. By default
+an in-memory cache of each process is used.
+"""
+
+PRESERVATION_SYNC_IDEMPOTENCY_CACHE_SIZE = 10000
+"""Maximum number of idempotency keys kept in the default in-memory store, ``0`` to disable it."""
+
+PRESERVATION_SYNC_IDEMPOTENCY_CACHE_TTL = 86400
+"""Seconds the response of an event sent with an idempotency key is replayed."""
+
+PRESERVATION_SYNC_IDEMPOTENCY_RESERVATION_TTL = 60
+"""Seconds an idempotency key stays reserved while its event is processed.
+
+The retries sent meanwhile are answered with a 409. It should exceed the time
+taken to process an event, the reservation is only left to expire if the
+processing fails unexpectedly.
+"""
+
+PRESERVATION_SYNC_COMPACTION_AGE = 30
+"""Days after which the superseded processing and failed preservation infos are deleted."""
+
+PRESERVATION_SYNC_COMPACTION_BATCH_SIZE = 1000
+"""Number of preservation infos deleted per transaction by the compaction."""
+
 PRESERVATION_SYNC_PERMISSION_POLICY = None
 """Override the default permission policy to read and write preservation information."""
 
@@ -63,6 +63,17 @@ class InvalidStatusError(PreservationSyncError):
         super().__init__(message or self.message)
 
 
+class BatchTooLargeError(PreservationSyncError):
+    """Batch of preservation infos too large error."""
+
+    message = "The batch contains {size} items, the maximum allowed is {max_size}."
+
+    def __init__(self, size=None, max_size=None, message=None):
+        """Constructor."""
+        self.message = self.message.format(size=size, max_size=max_size)
+        super().__init__(message or self.message)
+
+
 class ModuleDisabledError(PreservationSyncError):
     """Module disabled error."""
 
@@ -77,6 +88,12 @@ class ErrorHandlersMixin:
     """Mixin to define error handlers."""
 
     error_handlers = {
+        BatchTooLargeError: create_error_handler(
+            lambda e: HTTPJSONException(
+                code=400,
+                description=e.message,
+            )
+        ),
         InvalidStatusError: create_error_handler(
             lambda e: HTTPJSONException(
                 code=400,
@@ -86,7 +103,7 @@ class ErrorHandlersMixin:
         ma.ValidationError: create_error_handler(
             lambda e: HTTPJSONException(
                 code=400,
-                description=e.message,
+                description=str(e.messages),
             )
         ),
         PermissionDeniedError: create_error_handler(
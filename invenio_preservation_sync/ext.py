@@ -9,8 +9,10 @@
 """Invenio module that adds Preservation Sync integration to the platform."""
 
 from flask.blueprints import Blueprint
+from invenio_base.utils import obj_or_import_string
 
 from . import config
+from .cache import LRUCache
 from .resources import PreservationInfoResource, PreservationInfoResourceConfig
 from .services import PreservationInfoService
 from .services.config import PreservationInfoServiceConfig
@@ -42,9 +44,65 @@ class InvenioPreservationSync(object):
 
     def init_service(self, app):
         """Initialize the service."""
+        pid_cache = None
+        if app.config["PRESERVATION_SYNC_PID_CACHE_SIZE"]:
+            pid_cache = LRUCache(
+                maxsize=app.config["PRESERVATION_SYNC_PID_CACHE_SIZE"],
+                default_timeout=app.config["PRESERVATION_SYNC_PID_CACHE_TTL"],
+            )
+        render_cache = obj_or_import_string(
+            app.config["PRESERVATION_SYNC_RENDER_CACHE"]
+        )
+        if render_cache is None and app.config["PRESERVATION_SYNC_RENDER_CACHE_SIZE"]:
+            render_cache = LRUCache(
+                maxsize=app.config["PRESERVATION_SYNC_RENDER_CACHE_SIZE"],
+                default_timeout=app.config["PRESERVATION_SYNC_RENDER_CACHE_TTL"],
+            )
+        missing_cache = obj_or_import_string(
+            app.config["PRESERVATION_SYNC_MISSING_CACHE"]
+        )
+        if missing_cache is None and app.config["PRESERVATION_SYNC_MISSING_CACHE_SIZE"]:
+            missing_cache = LRUCache(
+                maxsize=app.config["PRESERVATION_SYNC_MISSING_CACHE_SIZE"],
+                default_timeout=app.config["PRESERVATION_SYNC_MISSING_CACHE_TTL"],
+            )
+        stats_cache = None
+        if app.config["PRESERVATION_SYNC_STATS_CACHE_TTL"]:
+            stats_cache = LRUCache(
+                maxsize=2,
+                default_timeout=app.config["PRESERVATION_SYNC_STATS_CACHE_TTL"],
+            )
+        idempotency_cache = obj_or_import_string(
+            app.config["PRESERVATION_SYNC_IDEMPOTENCY_CACHE"]
+        )
+        if (
+            idempotency_cache is None
+            and app.config["PRESERVATION_SYNC_IDEMPOTENCY_CACHE_SIZE"]
+        ):
+            idempotency_cache = LRUCache(
+                maxsize=app.config["PRESERVATION_SYNC_IDEMPOTENCY_CACHE_SIZE"],
+                default_timeout=app.config["PRESERVATION_SYNC_IDEMPOTENCY_CACHE_TTL"],
+            )
+        if (
+            app.config["PRESERVATION_SYNC_WRITE_BUFFER_SIZE"]
+            > app.config["PRESERVATION_SYNC_BATCH_MAX_SIZE"]
+        ):
+            raise ValueError(
+                "PRESERVATION_SYNC_WRITE_BUFFER_SIZE can't exceed "
+                "PRESERVATION_SYNC_BATCH_MAX_SIZE, the buffered events are "
+                "written as one batch."
+            )
         self.service = PreservationInfoService(
             config=PreservationInfoServiceConfig,
             perm_policy_cls=app.config["PRESERVATION_SYNC_PERMISSION_POLICY"],
+            pid_cache=pid_cache,
+            render_cache=render_cache,
+            missing_cache=missing_cache,
+            stats_cache=stats_cache,
+            idempotency_cache=idempotency_cache,
+            write_buffer_size=app.config["PRESERVATION_SYNC_WRITE_BUFFER_SIZE"],
+            write_buffer_delay=app.config["PRESERVATION_SYNC_WRITE_BUFFER_DELAY"],
+            write_buffer_timeout=app.config["PRESERVATION_SYNC_WRITE_BUFFER_TIMEOUT"],
         )
 
     def init_resources(self, app):
@@ -8,12 +8,15 @@
 
 """Models for Preservation Sync integration."""
 
+import hashlib
+import json
 import uuid
+from datetime import datetime, timezone
 from enum import Enum
 
 from invenio_db import db
 from invenio_webhooks.models import Event
-from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy_utils.models import Timestamp
 from sqlalchemy_utils.types import ChoiceType, JSONType, UUIDType
 
@@ -50,10 +53,78 @@ class PreservationStatus(str, Enum):
         return self.value
 
 
+_payload_fields = ("status", "harvest_timestamp", "uri", "path", "description")
+"""Fields compared to detect that a preservation info was already received."""
+
+
+def _payload_hash(data):
+    """Return the SHA-256 fingerprint of the payload fields of a preservation info.
+
+    The fields are serialized as canonical JSON, with the dates as naive UTC
+    ISO strings, so that the same payload always gives the same fingerprint.
+    """
+    harvest_timestamp = data.get("harvest_timestamp")
+    payload = [
+        PreservationInfoModel._convert_status(data["status"]).value,
+        _naive_utc(harvest_timestamp).isoformat() if harvest_timestamp else None,
+        data.get("uri"),
+        data.get("path"),
+        data.get("description"),
+    ]
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+_upsert_inserts = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+"""Dialect specific inserts supporting ``ON CONFLICT DO UPDATE``."""
+
+_lock_namespace = int.from_bytes(
+    hashlib.sha256(b"invenio-preservation-sync").digest()[:4], "big", signed=True
+)
+"""First key of the PostgreSQL advisory locks of the records, see ``lock``."""
+
+
+def _naive_utc(value):
+    """Return a date as the naive UTC date stored in the database."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _timestamp(data, field):
+    """Return a timestamp of a payload as the naive UTC date stored in the database."""
+    value = data.get(field)
+    return _naive_utc(value) if value is not None else None
+
+
 class PreservationInfoModel(db.Model, Timestamp):
     """Information about the preservation."""
 
     __tablename__ = "preservation_info"
+    __table_args__ = (
+        db.Index(
+            "ix_preservation_info_object_uuid_created",
+            "object_uuid",
+            "created",
+            "revision_id",
+            "archive_timestamp",
+        ),
+        db.Index("ix_preservation_info_updated_id", "updated", "id"),
+        db.Index(
+            "ix_preservation_info_description",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+        db.Index("ix_preservation_info_created_id", "created", "id"),
+        db.Index("ix_preservation_info_status_created_id", "status", "created", "id"),
+        db.UniqueConstraint(
+            "object_uuid",
+            "revision_id",
+            "archive_timestamp",
+            name="uq_preservation_info_object_uuid",
+        ),
+    )
 
     id = db.Column(
         UUIDType,
@@ -64,11 +135,14 @@ class PreservationInfoModel(db.Model, Timestamp):
 
     object_uuid = db.Column(
         UUIDType,
-        index=True,
+        index=False,
         nullable=False,
         unique=False,
     )
-    """Weak reference to a record identifier."""
+    """Weak reference to a record identifier.
+
+    Indexed as the prefix of the index matching the ordering used by :meth:`get`.
+    """
 
     revision_id = db.Column(
         db.Integer,
@@ -108,6 +182,12 @@ class PreservationInfoModel(db.Model, Timestamp):
     event_id = db.Column(UUIDType, db.ForeignKey(Event.id), nullable=True)
     """Incoming webhook event identifier."""
 
+    payload_hash = db.Column(db.String(64), nullable=True)
+    """SHA-256 fingerprint of the payload fields, to detect duplicate deliveries.
+
+    ``NULL`` for the preservation infos received before it was introduced.
+    """
+
     description = db.Column(
         db.JSON()
         .with_variant(
@@ -137,39 +217,422 @@ class PreservationInfoModel(db.Model, Timestamp):
             object_uuid=object_uuid,
             revision_id=data.get("revision_id"),
             status=status,
-            harvest_timestamp=data.get("harvest_timestamp"),
-            archive_timestamp=data.get("archive_timestamp"),
+            harvest_timestamp=_timestamp(data, "harvest_timestamp"),
+            archive_timestamp=_timestamp(data, "archive_timestamp"),
             uri=data.get("uri"),
             path=data.get("path"),
             event_id=event_id,
             description=data.get("description"),
+            payload_hash=_payload_hash(data),
         )
         return obj
 
     @classmethod
-    def get(cls, object_uuid, latest=False, pid=None):
-        """Get preservation info by object uuid."""
-        obj = cls.query.filter_by(object_uuid=object_uuid).order_by(
+    def create_or_update(cls, object_uuid, data, event_id=None):
+        """Create a preservation info or update the existing one.
+
+        On PostgreSQL and SQLite this is a single ``INSERT ... ON CONFLICT DO
+        UPDATE`` statement which only updates the existing row when its payload
+        fingerprint differs (or one of its fields, for the rows without
+        fingerprint), other databases read the existing row first.
+
+        :returns: Tuple of the preservation info and whether it was created.
+        :raises PreservationAlreadyReceivedError: If the same preservation info
+            already exists.
+        """
+        insert = _upsert_inserts.get(db.session.get_bind().dialect.name)
+        if insert is None:
+            existing_preservation = cls.get_existing_preservation(object_uuid, data)
+            if existing_preservation:
+                obj = cls.update_existing_preservation(
+                    existing_preservation, data, event_id=event_id
+                )
+                return obj, False
+            return cls.create(object_uuid, data, event_id), True
+
+        now = datetime.utcnow()
+        obj_id = uuid.uuid4()
+        stmt = insert(cls).values(
+            id=obj_id,
+            created=now,
+            updated=now,
+            object_uuid=object_uuid,
+            revision_id=data.get("revision_id"),
+            status=cls._convert_status(data["status"]),
+            harvest_timestamp=_timestamp(data, "harvest_timestamp"),
+            archive_timestamp=_timestamp(data, "archive_timestamp"),
+            uri=data.get("uri"),
+            path=data.get("path"),
+            event_id=event_id,
+            description=data.get("description"),
+            payload_hash=_payload_hash(data),
+        )
+        table = cls.__table__
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                table.c.object_uuid,
+                table.c.revision_id,
+                table.c.archive_timestamp,
+            ],
+            set_={
+                field: stmt.excluded[field]
+                for field in _payload_fields + ("payload_hash", "event_id", "updated")
+            },
+            where=db.case(
+                (
+                    table.c.payload_hash.is_(None),
+                    db.or_(
+                        *(
+                            table.c[field].is_distinct_from(stmt.excluded[field])
+                            for field in _payload_fields
+                        )
+                    ),
+                ),
+                else_=table.c.payload_hash != stmt.excluded.payload_hash,
+            ),
+        ).returning(cls)
+        obj = db.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        ).scalar_one_or_none()
+        if obj is None:
+            raise PreservationAlreadyReceivedError(data["pid"])
+        return obj, obj.id == obj_id
+
+    @classmethod
+    def lock(cls, object_uuids):
+        """Lock the records until the end of the transaction.
+
+        Serializes the concurrent writes of the preservation infos of a record,
+        so that reading the existing preservation info and updating it, or the
+        latest preservation info of the record, can't race. The records are
+        locked in a consistent order to avoid deadlocks.
+
+        Only PostgreSQL is supported, with transaction level advisory locks
+        keyed by the module namespace and the first 32 bits of the record
+        uuid. On other databases nothing is locked, concurrent first writes of
+        a record can then fail on the unique constraint of the preservation
+        infos.
+        """
+        if db.session.get_bind().dialect.name != "postgresql":
+            return
+        keys = sorted(
+            {
+                int.from_bytes(uuid.UUID(str(value)).bytes[:4], "big", signed=True)
+                for value in object_uuids
+            }
+        )
+        if not keys:
+            return
+        db.session.execute(
+            db.text(
+                "SELECT pg_advisory_xact_lock(:namespace, key) "
+                "FROM unnest(CAST(:keys AS integer[])) AS key"
+            ),
+            {"namespace": _lock_namespace, "keys": keys},
+        )
+
+    @classmethod
+    def get(cls, object_uuid, latest=False, pid=None, defer=()):
+        """Get preservation info by object uuid.
+
+        The latest preservation info is read from
+        :class:`PreservationInfoLatestModel` with a primary key lookup.
+
+        :param defer: Names of the columns not to load unless accessed.
+        """
+        if latest:
+            latest_obj = db.session.get(
+                PreservationInfoLatestModel,
+                object_uuid,
+                options=PreservationInfoLatestModel.defer_options(defer),
+            )
+            if latest_obj is None:
+                raise PreservationInfoNotFoundError(pid=pid)
+            return latest_obj.preservation
+        return (
+            cls.query.filter_by(object_uuid=object_uuid)
+            .options(*cls.defer_options(defer))
+            .order_by(*cls.latest_order_by())
+            .all()
+        )
+
+    @classmethod
+    def defer_options(cls, defer=()):
+        """Return the loader options deferring the given columns."""
+        return [db.defer(getattr(cls, name)) for name in defer]
+
+    @classmethod
+    def get_latest_many(cls, object_uuids, defer=()):
+        """Get the latest preservation info of many records with one query.
+
+        :param defer: Names of the columns not to load unless accessed.
+        :returns: Dictionary of object uuid to its latest preservation info,
+            records without preservation info are left out.
+        """
+        object_uuids = list(object_uuids)
+        if not object_uuids:
+            return {}
+        query = PreservationInfoLatestModel.query.filter(
+            PreservationInfoLatestModel.object_uuid.in_(object_uuids)
+        ).options(*PreservationInfoLatestModel.defer_options(defer))
+        return {obj.object_uuid: obj.preservation for obj in query}
+
+    @classmethod
+    def get_page(cls, object_uuid, page=1, size=10, defer=()):
+        """Get a page of the preservation infos of a record, latest first."""
+        return (
+            cls.query.filter_by(object_uuid=object_uuid)
+            .options(*cls.defer_options(defer))
+            .order_by(*cls.latest_order_by())
+            .paginate(page=page, per_page=size, error_out=False)
+        )
+
+    @classmethod
+    def get_after(cls, object_uuid, after=None, size=10, defer=()):
+        """Get the preservation infos of a record following a keyset cursor.
+
+        The preservation infos are ordered by ``created`` and ``id``, latest
+        first, so that each page is read from the index without an offset.
+
+        :param after: ``(created, id)`` of the last preservation info of the
+            previous page, ``None`` for the first page.
+        """
+        query = cls.query.filter_by(object_uuid=object_uuid).options(
+            *cls.defer_options(defer)
+        )
+        return cls._keyset_page(query, after, size)
+
+    @classmethod
+    def search(cls, after=None, size=10, **filters):
+        """Search the preservation infos of all the records.
+
+        The preservation infos are ordered by ``created`` and ``id``, latest
+        first, and paginated with a keyset cursor as in :meth:`get_after`. The
+        pages are read from the ``(created, id)`` index, or the
+        ``(status, created, id)`` one when filtering on a single status.
+
+        :param filters: Filters of :meth:`filter_query`.
+        """
+        query = cls.filter_query(cls.query, **filters)
+        return cls._keyset_page(query, after, size)
+
+    @classmethod
+    def get_changes(cls, after=None, until=None, size=100):
+        """Get the preservation infos created or updated after a keyset cursor.
+
+        The preservation infos are ordered by ``updated`` and ``id``, oldest
+        first, and read from the ``(updated, id)`` index.
+
+        :param after: ``(updated, id)`` of the last preservation info of the
+            previous page, ``None`` to start from the beginning.
+        :param until: Only return the preservation infos updated before it.
+        """
+        query = cls.query
+        if after is not None:
+            query = query.filter(db.tuple_(cls.updated, cls.id) > tuple(after))
+        if until is not None:
+            query = query.filter(cls.updated < until)
+        return query.order_by(cls.updated, cls.id).limit(size).all()
+
+    @classmethod
+    def _keyset_page(cls, query, after, size):
+        """Return the page of the query following a ``(created, id)`` cursor."""
+        if after is not None:
+            # A row comparison is an index condition, unlike its OR expansion
+            query = query.filter(db.tuple_(cls.created, cls.id) < tuple(after))
+        return query.order_by(cls.created.desc(), cls.id.desc()).limit(size).all()
+
+    @classmethod
+    def filter_query(
+        cls,
+        query,
+        status=None,
+        revision_id=None,
+        created_from=None,
+        created_to=None,
+        archived_from=None,
+        archived_to=None,
+        harvested_from=None,
+        harvested_to=None,
+        description=None,
+    ):
+        """Filter a query on the status, the revision, the dates and the description.
+
+        The ranges include their start and exclude their end, timezone aware
+        dates are converted to the naive UTC dates stored in the table.
+
+        :param status: Iterable of statuses, any of them matches.
+        :param description: Dictionary of dotted key paths to the string values
+            they must have in the description, see :meth:`description_filter`.
+        """
+        if status:
+            query = query.filter(
+                cls.status.in_([cls._convert_status(value) for value in status])
+            )
+        if revision_id is not None:
+            query = query.filter(cls.revision_id == revision_id)
+        for column, start, end in (
+            (cls.created, created_from, created_to),
+            (cls.archive_timestamp, archived_from, archived_to),
+            (cls.harvest_timestamp, harvested_from, harvested_to),
+        ):
+            if start is not None:
+                query = query.filter(column >= _naive_utc(start))
+            if end is not None:
+                query = query.filter(column < _naive_utc(end))
+        for path, value in (description or {}).items():
+            query = query.filter(cls.description_filter(path, value))
+        return query
+
+    @classmethod
+    def description_filter(cls, path, value):
+        """Return the clause matching a value at a dotted key path of the description.
+
+        On PostgreSQL it is a JSONB containment, which can use the GIN index of
+        the description. The other databases extract the value with their JSON
+        functions, scanning the rows.
+        """
+        keys = path.split(".")
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            document = value
+            for key in reversed(keys):
+                document = {key: document}
+            return db.type_coerce(cls.description, postgresql.JSONB).contains(document)
+
+        json_path = "$" + "".join(f'."{key}"' for key in keys)
+        extracted = db.func.json_extract(cls.description, json_path)
+        if dialect == "mysql":
+            extracted = db.func.json_unquote(extracted)
+        return extracted == value
+
+    @classmethod
+    def export(cls, batch_size=1000, **filters):
+        """Iterate over the preservation infos matching the filters.
+
+        The rows are fetched ``batch_size`` at a time through a server-side
+        cursor (where the driver supports it), so memory usage stays constant
+        regardless of the size of the table.
+
+        :param filters: Filters of :meth:`filter_query`.
+        """
+        query = cls.filter_query(db.select(cls), **filters)
+        return db.session.scalars(query.execution_options(yield_per=batch_size))
+
+    @classmethod
+    def count_by_status(cls):
+        """Count the preservation infos of each status with a single query.
+
+        :returns: Dictionary of status value to count, statuses without
+            preservation info are left out.
+        """
+        query = db.select(cls.status, db.func.count()).group_by(cls.status)
+        return {status.value: count for status, count in db.session.execute(query)}
+
+    @classmethod
+    def compact(cls, created_before, batch_size=1000):
+        """Delete the superseded processing and failed preservation infos.
+
+        A preservation info is superseded when a newer one exists for the same
+        record revision, so the latest one of each ``(object_uuid, revision_id)``
+        and the latest one of each record are always kept. The events that only
+        the deleted preservation infos referenced are deleted with them.
+
+        :param created_before: Only delete preservation infos created before.
+        :param batch_size: Number of preservation infos deleted per batch.
+        :returns: Generator of the number of preservation infos and events
+            deleted in each batch, the caller is responsible for committing after
+            each of them.
+        """
+        newer = db.aliased(cls)
+        superseded = (
+            db.select(newer.id)
+            .where(
+                newer.object_uuid == cls.object_uuid,
+                newer.revision_id.is_not_distinct_from(cls.revision_id),
+                db.or_(
+                    newer.created > cls.created,
+                    db.and_(newer.created == cls.created, newer.id > cls.id),
+                ),
+            )
+            .exists()
+        )
+        query = (
+            db.select(cls.id, cls.event_id)
+            .where(
+                cls.status.in_(
+                    [PreservationStatus.PROCESSING, PreservationStatus.FAILED]
+                ),
+                cls.created < _naive_utc(created_before),
+                superseded,
+                cls.id.not_in(db.select(PreservationInfoLatestModel.preservation_id)),
+            )
+            .limit(batch_size)
+        )
+        while True:
+            rows = db.session.execute(query).all()
+            if not rows:
+                return
+
+            db.session.execute(
+                db.delete(cls)
+                .where(cls.id.in_([id_ for id_, _ in rows]))
+                .execution_options(synchronize_session=False)
+            )
+            event_ids = {event_id for _, event_id in rows if event_id is not None}
+            events = 0
+            if event_ids:
+                referenced = db.select(cls.event_id).where(cls.event_id.in_(event_ids))
+                events = db.session.execute(
+                    db.delete(Event)
+                    .where(Event.id.in_(event_ids), Event.id.not_in(referenced))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+            yield len(rows), events
+
+    @classmethod
+    def latest_order_by(cls):
+        """Return the ordering of the preservation infos, latest first."""
+        return (
             cls.created.desc(),
             cls.revision_id.desc(),
             cls.archive_timestamp.desc(),
         )
-        results = obj.first() if latest else obj.all()
-        if not results and latest:
-            raise PreservationInfoNotFoundError(pid=pid)
-        return results
 
     @classmethod
     def get_existing_preservation(cls, object_uuid, data):
         """Return preservation info if it already exists."""
-        if data.get("revision_id") and data.get("archive_timestamp"):
+        # Same key as the unique constraint, revision 0 included
+        if (
+            data.get("revision_id") is not None
+            and data.get("archive_timestamp") is not None
+        ):
             return PreservationInfoModel.query.filter_by(
                 object_uuid=object_uuid,
                 revision_id=data.get("revision_id"),
-                archive_timestamp=data.get("archive_timestamp"),
+                archive_timestamp=_timestamp(data, "archive_timestamp"),
             ).first()
         return None
 
+    @classmethod
+    def get_existing_preservations(cls, keys):
+        """Return the existing preservation infos matching the given keys.
+
+        :param keys: Iterable of ``(object_uuid, revision_id, archive_timestamp)``.
+        :returns: Dictionary mapping each found key to its preservation info.
+        """
+        keys = {key for key in keys if key[1] is not None and key[2] is not None}
+        if not keys:
+            return {}
+        # Duplicates are detected with the fingerprint, not the description
+        query = cls.query.filter(
+            db.tuple_(cls.object_uuid, cls.revision_id, cls.archive_timestamp).in_(keys)
+        ).options(*cls.defer_options(["description"]))
+        return {
+            (obj.object_uuid, obj.revision_id, obj.archive_timestamp): obj
+            for obj in query
+        }
+
     @classmethod
     def update_existing_preservation(
         cls,
@@ -179,21 +642,27 @@ class PreservationInfoModel(db.Model, Timestamp):
     ):
         """Update existing preservation."""
         status = cls._convert_status(data["status"])
+        payload_hash = _payload_hash(data)
 
-        if (
-            obj.status == status
-            and obj.harvest_timestamp == data.get("harvest_timestamp")
-            and obj.uri == data.get("uri")
-            and obj.path == data.get("path")
-            and obj.description == data.get("description")
-        ):
+        if obj.payload_hash is not None:
+            already_received = obj.payload_hash == payload_hash
+        else:
+            already_received = (
+                obj.status == status
+                and obj.harvest_timestamp == _timestamp(data, "harvest_timestamp")
+                and obj.uri == data.get("uri")
+                and obj.path == data.get("path")
+                and obj.description == data.get("description")
+            )
+        if already_received:
             raise PreservationAlreadyReceivedError(data["pid"])
 
         obj.status = status
-        obj.harvest_timestamp = data.get("harvest_timestamp")
+        obj.harvest_timestamp = _timestamp(data, "harvest_timestamp")
         obj.uri = data.get("uri")
         obj.path = data.get("path")
         obj.description = data.get("description")
+        obj.payload_hash = payload_hash
         obj.event_id = event_id
 
         return obj
@@ -209,3 +678,134 @@ class PreservationInfoModel(db.Model, Timestamp):
             raise InvalidStatusError(
                 f"Status value must be a PreservationStatus or a string. Got {value}"
             )
+
+
+class PreservationInfoLatestModel(db.Model):
+    """Latest preservation info of each record.
+
+    Maintained on every new preservation info so that the latest one is read
+    with a primary key lookup instead of sorting the record's history.
+    """
+
+    __tablename__ = "preservation_info_latest"
+
+    object_uuid = db.Column(UUIDType, primary_key=True)
+    """Weak reference to a record identifier."""
+
+    preservation_id = db.Column(
+        UUIDType,
+        db.ForeignKey(PreservationInfoModel.id, ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    """Latest preservation info of the record."""
+
+    preservation = db.relationship(PreservationInfoModel, lazy="joined")
+
+    @classmethod
+    def defer_options(cls, defer=()):
+        """Return the loader options deferring the given preservation info columns."""
+        if not defer:
+            return []
+        return [
+            db.joinedload(cls.preservation).options(
+                *PreservationInfoModel.defer_options(defer)
+            )
+        ]
+
+    @classmethod
+    def set(cls, preservation):
+        """Set the given preservation info as the latest of its record."""
+        obj = db.session.get(cls, preservation.object_uuid)
+        if obj is None:
+            obj = cls(object_uuid=preservation.object_uuid)
+        obj.preservation = preservation
+        return obj
+
+    @classmethod
+    def count_by_status(cls):
+        """Count the records by the status of their latest preservation info.
+
+        :returns: Dictionary of status value to count, statuses without
+            records are left out.
+        """
+        model = PreservationInfoModel
+        query = (
+            db.select(model.status, db.func.count())
+            .select_from(cls)
+            .join(model, cls.preservation_id == model.id)
+            .group_by(model.status)
+        )
+        return {status.value: count for status, count in db.session.execute(query)}
+
+    @classmethod
+    def set_many(cls, preservations):
+        """Set the given preservation infos as the latest of their records.
+
+        When several preservation infos belong to the same record, the last one
+        of the iterable wins.
+        """
+        preservations = {obj.object_uuid: obj for obj in preservations}
+        if not preservations:
+            return []
+        existing = {
+            obj.object_uuid: obj
+            for obj in cls.query.filter(cls.object_uuid.in_(preservations))
+        }
+        results = []
+        for object_uuid, preservation in preservations.items():
+            obj = existing.get(object_uuid) or cls(object_uuid=object_uuid)
+            obj.preservation = preservation
+            results.append(obj)
+        return results
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Rebuild the table from the preservation infos, batch by batch.
+
+        :returns: Generator of the object uuids of the records processed in each
+            batch, the caller is responsible for committing after each of them.
+        """
+        model = PreservationInfoModel
+        last_object_uuid = None
+        while True:
+            query = db.select(model.object_uuid).distinct()
+            if last_object_uuid is not None:
+                query = query.where(model.object_uuid > last_object_uuid)
+            object_uuids = (
+                db.session.execute(query.order_by(model.object_uuid).limit(batch_size))
+                .scalars()
+                .all()
+            )
+            if not object_uuids:
+                return
+
+            ranked = (
+                db.select(
+                    model.object_uuid,
+                    model.id,
+                    db.func.row_number()
+                    .over(
+                        partition_by=model.object_uuid,
+                        order_by=model.latest_order_by(),
+                    )
+                    .label("row_num"),
+                )
+                .where(model.object_uuid.in_(object_uuids))
+                .subquery()
+            )
+            rows = db.session.execute(
+                db.select(ranked.c.object_uuid, ranked.c.id).where(
+                    ranked.c.row_num == 1
+                )
+            ).all()
+            db.session.execute(db.delete(cls).where(cls.object_uuid.in_(object_uuids)))
+            db.session.execute(
+                db.insert(cls),
+                [
+                    {"object_uuid": object_uuid, "preservation_id": preservation_id}
+                    for object_uuid, preservation_id in rows
+                ],
+            )
+            last_object_uuid = object_uuids[-1]
+            yield object_uuids
@@ -8,29 +8,225 @@
 
 """Receiver for managing Preservation Sync events integration."""
 
-from flask import current_app, g
+import hashlib
+import json
+import threading
+from collections import Counter
+
+from flask import abort, current_app, g, jsonify, request
+from invenio_db import db
 from invenio_pidstore.errors import PIDDoesNotExistError
 from invenio_webhooks.models import Receiver
 from marshmallow import ValidationError
+from sqlalchemy.exc import InterfaceError, OperationalError
 
 from .errors import (
+    BatchTooLargeError,
     InvalidStatusError,
     ModuleDisabledError,
     PermissionDeniedError,
     PreservationAlreadyReceivedError,
 )
 from .proxies import current_preservation_sync_service as service
+from .tasks import process_event, shard
 
 
 class PreservationSyncReceiver(Receiver):
     """Handle incoming notification from an external preservation platform."""
 
-    def run(self, event):
+    idempotency_header = "Idempotency-Key"
+    """Request header holding the idempotency key of an event."""
+
+    idempotency_field = "idempotency_key"
+    """Payload field holding the idempotency key of an event."""
+
+    def __init__(self, receiver_id):
+        """Constructor."""
+        super().__init__(receiver_id)
+        # Number of payloads rejected before their event was created, by reason
+        self.rejections = Counter()
+        self._rejections_lock = threading.Lock()
+
+    def extract_payload(self):
+        """Extract the payload, replaying the response of a known idempotency key.
+
+        When the event is sent with an idempotency key (header or payload field)
+        that was already processed, the stored response is returned right away,
+        before the event is created, or a 422 if the key was used with another
+        payload. Otherwise the key is reserved until the event is processed, and
+        the retries sent meanwhile are answered with a 409. The replays don't
+        validate the payload again, the other payloads are then rejected before
+        the event is created if invalid, see :meth:`validate_payload`.
+        """
+        payload = super().extract_payload()
+        if not current_app.config["PRESERVATION_SYNC_ENABLED"]:
+            self._reject("disabled", 404, ModuleDisabledError.message)
+        key = request.headers.get(self.idempotency_header)
+        if isinstance(payload, dict):
+            key = payload.pop(self.idempotency_field, None) or key
+        if key and service.idempotency_cache is not None:
+            key = f"preservation-sync:idempotency:{g.identity.id}:{key}"
+            fingerprint = self._fingerprint(payload)
+            reservation = {"fingerprint": fingerprint}
+            reserved = service.idempotency_cache.add(
+                key,
+                reservation,
+                timeout=current_app.config[
+                    "PRESERVATION_SYNC_IDEMPOTENCY_RESERVATION_TTL"
+                ],
+            )
+            if not reserved:
+                # A reservation expired since the add is handled as in progress
+                stored = service.idempotency_cache.get(key) or reservation
+                if stored["fingerprint"] != fingerprint:
+                    self._reject(
+                        "idempotency_key_reused",
+                        422,
+                        "The idempotency key was already used with another payload.",
+                    )
+                if "response_code" not in stored:
+                    self._reject(
+                        "idempotency_key_in_progress",
+                        409,
+                        "The event with this idempotency key is being processed.",
+                    )
+                abort(self._replay_response(stored))
+            g.preservation_sync_idempotency = (key, fingerprint)
+        self.validate_payload(payload)
+        return payload
+
+    @staticmethod
+    def _fingerprint(payload):
+        """Return the SHA-256 fingerprint of a payload."""
+        canonical = json.dumps(
+            payload, sort_keys=True, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def validate_payload(self, payload):
+        """Reject the payloads that can't be processed without storing them.
+
+        Only the checks that don't need the database run here: the module being
+        enabled, the batch size and the schema of a single payload. The items of
+        a batch are still validated one by one when the event is processed.
+        """
+        if not current_app.config["PRESERVATION_SYNC_ENABLED"]:
+            self._reject("disabled", 404, ModuleDisabledError.message)
+        if isinstance(payload, list):
+            max_size = current_app.config["PRESERVATION_SYNC_BATCH_MAX_SIZE"]
+            if len(payload) > max_size:
+                error = BatchTooLargeError(size=len(payload), max_size=max_size)
+                self._reject("batch_too_large", 400, str(error))
+        elif isinstance(payload, dict):
+            try:
+                service.schema.load(payload)
+            except ValidationError as e:
+                self._reject("invalid", 400, str(e))
+        else:
+            self._reject("invalid", 400, "The payload must be an object or a list.")
+
+    def _reject(self, reason, code, message):
+        """Count the rejection and abort with the error response.
+
+        The idempotency key reserved for the payload, if any, is released.
+        """
+        idempotency = g.pop("preservation_sync_idempotency", None)
+        if idempotency is not None:
+            service.idempotency_cache.delete(idempotency[0])
+        with self._rejections_lock:
+            self.rejections[reason] += 1
+        response = jsonify(message=message, status=code)
+        response.status_code = code
+        response.headers["X-Hub-Event"] = self.receiver_id
+        abort(response)
+
+    def __call__(self, event):
+        """Process the event, or dispatch it to Celery tasks in async mode.
+
+        In async mode the event is acknowledged with its default 202 response,
+        which is also the one replayed for its idempotency key.
+        """
+        if not current_app.config["PRESERVATION_SYNC_ASYNC"]:
+            return self.run(event)
+        self._store_response(event)
+        for queue, items in self.routes(event):
+            process_event.apply_async(args=[str(event.id), items], queue=queue)
+
+    def routes(self, event):
+        """Return the Celery queue of each part of the event, if sharded.
+
+        A batch is split by the shard of the record of each item, so that the
+        events of a record are processed in order by the worker of its queue.
+        The items whose record can't be resolved don't need to be ordered, so
+        they all go to the first queue.
+
+        :returns: List of ``(queue, items)``, with the indices of the items of
+            a batch to process on the queue or ``None`` for the whole event.
+        """
+        config = current_app.config
+        shards = config["PRESERVATION_SYNC_ASYNC_SHARDS"]
+        if shards <= 1:
+            return [(None, None)]
+        payload = event.payload
+        items = payload if isinstance(payload, list) else [payload]
+        pids = [item.get("pid") if isinstance(item, dict) else None for item in items]
+        object_uuids = service.resolve_pids(pid for pid in pids if isinstance(pid, str))
+        indices = {}
+        for index, pid in enumerate(pids):
+            object_uuid = object_uuids.get(pid) if isinstance(pid, str) else None
+            number = shard(object_uuid, shards) if object_uuid else 0
+            indices.setdefault(number, []).append(index)
+        queue = config["PRESERVATION_SYNC_ASYNC_QUEUE"]
+        if not isinstance(payload, list):
+            return [(f"{queue}.{number}", None) for number in indices]
+        return [
+            (f"{queue}.{number}", part)
+            for number, part in sorted((indices or {0: []}).items())
+        ]
+
+    def _replay_response(self, stored):
+        """Return the response of an already processed event."""
+        response = jsonify(**stored["response"])
+        response.status_code = stored["response_code"]
+        response.headers["X-Hub-Event"] = self.receiver_id
+        response.headers["X-Hub-Delivery"] = stored["event_id"]
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    def _store_response(self, event):
+        """Store the response of the event for its idempotency key, if any.
+
+        Server errors and unresolved PIDs are not stored, so that the event can
+        be retried once the cause is fixed, e.g. the record is published: the
+        reservation of the key is released instead.
+        """
+        idempotency = g.pop("preservation_sync_idempotency", None)
+        if idempotency is None:
+            return
+        key, fingerprint = idempotency
+        if event.response_code == 404 or event.response_code >= 500:
+            service.idempotency_cache.delete(key)
+            return
+        service.idempotency_cache.set(
+            key,
+            {
+                "event_id": str(event.id),
+                "fingerprint": fingerprint,
+                "response_code": event.response_code,
+                "response": event.response,
+            },
+            timeout=current_app.config["PRESERVATION_SYNC_IDEMPOTENCY_CACHE_TTL"],
+        )
+
+    def run(self, event, identity=None, items=None):
         """Process an event.
 
         POST endpoint: /api/hooks/receivers/preservation/events.
 
-        :param event: Payload contains request body params:
+        :param event: Payload contains request body params, or a list of them
+            to process a whole batch at once. An ``Idempotency-Key`` header (or
+            ``idempotency_key`` field) makes retries of the same event replay
+            the first response:
 
         * **pid_id**: PersistentIdentifier ID.
         * **status**: Preservation status. ("P", "F", "I", "D")
@@ -41,36 +237,105 @@ class PreservationSyncReceiver(Receiver):
         * **path**: Path for the preserved object. (optional)
         * **description**: Any additional info in JSON format. (optional)
 
+        :param identity: Identity processing the event, defaults to the one of
+            the request.
+        :param items: Indices of the items of a batch to process, defaults to
+            all of them. The results of the other items are left as they are,
+            ``None`` until they are processed.
+
         :returns: Response status code, see *message* for more details
 
-        * **202** - Event successfully received.
-        * **400** - Body params were not valid.
+        * **202** - Event successfully received. For a batch, *hits* holds the
+          ``pid``, ``status`` (202, 400, 404 or 409) and ``message`` per item.
+        * **400** - Body params were not valid or the batch was too large.
         * **403** - Permission requirements were not met.
         * **404** - Record with given PID was not found or the module is disabled.
         * **409** - Preservation information was already received.
-        * **503** - Mandatory config was missing.
+        * **503** - Mandatory config was missing, the database was unavailable
+          or the buffered write timed out.
+
+        With ``PRESERVATION_SYNC_ASYNC`` enabled the request is answered with a
+        202 and the above outcome is written to the event by a Celery task.
         """
         try:
             if not current_app.config["PRESERVATION_SYNC_ENABLED"]:
                 raise ModuleDisabledError()
 
-            service.create_or_update(
-                identity=g.identity,
-                data=event.payload,
-                event_id=event.id,
-            )
+            identity = identity or g.identity
+
+            if isinstance(event.payload, list) and items is not None:
+                results = service.create_or_update_many(
+                    identity=identity,
+                    data=[event.payload[index] for index in items],
+                    event_id=event.id,
+                )
+                self._merge_hits(event, items, results)
+            elif isinstance(event.payload, list):
+                results = service.create_or_update_many(
+                    identity=identity,
+                    data=event.payload,
+                    event_id=event.id,
+                )
+                event.response = dict(message="Accepted.", status=202, hits=results)
+            elif service.write_buffer is not None:
+                result = service.create_or_update_buffered(
+                    identity=identity,
+                    data=event.payload,
+                    event_id=event.id,
+                )
+                if result["status"] != 202:
+                    event.response_code = result["status"]
+                    event.response = dict(
+                        message=result["message"], status=result["status"]
+                    )
+            else:
+                service.create_or_update(
+                    identity=identity,
+                    data=event.payload,
+                    event_id=event.id,
+                )
         except PreservationAlreadyReceivedError as e:
-            event.response_code = 409
-            event.response = dict(message=str(e), status=409)
+            self._set_error(event, items, 409, e)
         except (ModuleDisabledError, PIDDoesNotExistError) as e:
-            event.response_code = 404
-            event.response = dict(message=str(e), status=404)
+            self._set_error(event, items, 404, e)
         except PermissionDeniedError as e:
-            event.response_code = 403
-            event.response = dict(message=str(e), status=403)
-        except AssertionError as e:
-            event.response_code = 503
-            event.response = dict(message=str(e), status=503)
-        except (InvalidStatusError, ValidationError, Exception) as e:
-            event.response_code = 400
-            event.response = dict(message=str(e), status=400)
+            self._set_error(event, items, 403, e)
+        except (AssertionError, OperationalError, InterfaceError, TimeoutError) as e:
+            # Missing config or unavailable database, the event can be retried
+            self._set_error(event, items, 503, e)
+        except (
+            BatchTooLargeError,
+            InvalidStatusError,
+            ValidationError,
+            Exception,
+        ) as e:
+            self._set_error(event, items, 400, e)
+        self._store_response(event)
+
+    def _set_error(self, event, items, code, error):
+        """Write the error of an event, or of a part of a batch to its items."""
+        if items is None or not isinstance(event.payload, list):
+            event.response_code = code
+            event.response = dict(message=str(error), status=code)
+            return
+        results = [
+            {
+                "pid": item.get("pid") if isinstance(item, dict) else None,
+                "status": code,
+                "message": str(error),
+            }
+            for item in (event.payload[index] for index in items)
+        ]
+        self._merge_hits(event, items, results)
+
+    def _merge_hits(self, event, items, results):
+        """Write the results of a part of a batch to the hits of its event.
+
+        The other parts of the batch are processed concurrently, so the event
+        is locked and refreshed before its hits are merged.
+        """
+        db.session.refresh(event, with_for_update=True)
+        hits = list((event.response or {}).get("hits") or [None] * len(event.payload))
+        for index, result in zip(items, results):
+            hits[index] = result
+        event.response = dict(message="Accepted.", status=202, hits=hits)
@@ -11,6 +11,8 @@
 import marshmallow as ma
 from flask_resources import JSONSerializer, ResourceConfig, ResponseHandler
 
+from ..models import PreservationStatus
+
 
 class PreservationInfoResourceConfig(ResourceConfig):
     """Preservation Info resource config."""
@@ -20,10 +22,40 @@ class PreservationInfoResourceConfig(ResourceConfig):
     routes = {
         "latest": "/records/<pid_id>/preservations/latest",
         "list": "/records/<pid_id>/preservations",
+        "latest-many": "/preservations/latest",
+        "search": "/preservations",
+        "changes": "/preservations/changes",
+        "export": "/preservations/export",
+        "stats": "/preservations/stats",
     }
 
     request_view_args = {
         "pid_id": ma.fields.String(),
     }
 
+    request_read_args = {
+        "fields": ma.fields.String(),
+    }
+
+    request_search_args = {
+        "page": ma.fields.Integer(validate=ma.validate.Range(min=1)),
+        "size": ma.fields.Integer(validate=ma.validate.Range(min=1)),
+        "after": ma.fields.String(),
+    }
+
+    request_filter_args = {
+        "status": ma.fields.List(ma.fields.Enum(PreservationStatus, by_value=True)),
+        "revision_id": ma.fields.Integer(),
+        "created_from": ma.fields.DateTime(),
+        "created_to": ma.fields.DateTime(),
+        "archived_from": ma.fields.DateTime(),
+        "archived_to": ma.fields.DateTime(),
+        "harvested_from": ma.fields.DateTime(),
+        "harvested_to": ma.fields.DateTime(),
+    }
+
+    request_stats_args = {
+        "latest": ma.fields.Boolean(),
+    }
+
     response_handlers = {"application/json": ResponseHandler(JSONSerializer())}
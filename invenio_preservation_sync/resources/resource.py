@@ -8,10 +8,13 @@
 
 """Invenio Preservation Sync module to create REST APIs."""
 
-from flask import g
+import zlib
+
+from flask import Response, after_this_request, g, request, stream_with_context, url_for
 from flask_resources import (
     Resource,
     from_conf,
+    request_body_parser,
     request_parser,
     resource_requestctx,
     response_handler,
@@ -21,6 +24,24 @@ from flask_resources import (
 from ..errors import ErrorHandlersMixin
 
 request_view_args = request_parser(from_conf("request_view_args"), location="view_args")
+request_read_args = request_parser(from_conf("request_read_args"), location="args")
+request_search_args = request_parser(from_conf("request_search_args"), location="args")
+request_stats_args = request_parser(from_conf("request_stats_args"), location="args")
+request_filter_args = request_parser(from_conf("request_filter_args"), location="args")
+request_data = request_body_parser(
+    parsers=from_conf("request_body_parsers"),
+    default_content_type=from_conf("default_content_type"),
+)
+
+
+def _gzip(lines):
+    """Compress a stream of text lines into gzip chunks."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for line in lines:
+        chunk = compressor.compress(line.encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
 
 
 class PreservationInfoResource(ErrorHandlersMixin, Resource):
@@ -41,6 +62,16 @@ class PreservationInfoResource(ErrorHandlersMixin, Resource):
 
         * **GET** list of preservations path can be configured in :attr:`invenio_preservation_sync.config.PRESERVATION_SYNC_GET_LIST_PATH`
              (Default: */records/<pid_id>/preservations/*).
+
+        * **POST** latest preservation of many records (*/preservations/latest*).
+
+        * **GET** search of the preservations of all the records (*/preservations*).
+
+        * **GET** change feed of the preservations (*/preservations/changes*).
+
+        * **GET** export of all the preservations (*/preservations/export*).
+
+        * **GET** number of preservations of each status (*/preservations/stats*).
         """
         routes = self.config.routes
         if not self.latest_route:
@@ -50,43 +81,283 @@ class PreservationInfoResource(ErrorHandlersMixin, Resource):
         return [
             route("GET", self.latest_route, self.get_latest),
             route("GET", self.list_route, self.get_list),
+            route("POST", routes["latest-many"], self.get_latest_many),
+            route("GET", routes["search"], self.search),
+            route("GET", routes["changes"], self.get_changes),
+            route("GET", routes["export"], self.export),
+            route("GET", routes["stats"], self.get_stats),
         ]
 
     @request_view_args
+    @request_read_args
     @response_handler()
     def get_latest(self):
         """GET endpoint to return the latest preservation info for a given record.
 
         Request param: **pid_id** PersistentIdentifier ID for the record.
 
+        Query params:
+
+        * **fields**: Comma separated names of the fields to return, e.g. *status,archive_timestamp*. (optional)
+
         :returns: Response status code, see *message* for more details
 
         * **200** - Latest preservation is returned as a JSON object.
+        * **304** - Latest preservation did not change since the *If-None-Match* / *If-Modified-Since* request headers.
         * **400** - Parameter was not valid.
         * **403** - Permission requirement was not met.
         * **404** - PID could not be resolved or there are no preservations for the given record or the module is disabled.
         * **503** - Mandatory config was missing.
         """
         pid_id = resource_requestctx.view_args["pid_id"]
-        preservation = self.service.read(g.identity, pid_id, latest=True)
+        preservation = self.service.read(
+            g.identity, pid_id, latest=True, fields=self._requested_fields()
+        )
+        if self._is_not_modified(preservation):
+            return None, 304
         return preservation.to_dict(), 200
 
+    @request_read_args
+    @request_data
+    @response_handler()
+    def get_latest_many(self):
+        """POST endpoint to return the latest preservation info of many records.
+
+        Request body: **pids** List of PersistentIdentifier IDs of the records.
+
+        Query params:
+
+        * **fields**: Comma separated names of the fields to return. (optional)
+
+        :returns: Response status code, see *message* for more details
+
+        * **200** - Latest preservations (*hits, hits*) with their *pid*, records
+            without preservation info or unresolvable PIDs are listed in *errors*.
+        * **400** - Body was not valid or contained too many PIDs.
+        * **403** - Permission requirement was not met.
+        * **404** - The module is disabled.
+        * **503** - Mandatory config was missing.
+        """
+        preservations = self.service.read_latest_many(
+            g.identity,
+            resource_requestctx.data or {},
+            fields=self._requested_fields(),
+        )
+        return preservations.to_dict(), 200
+
     @request_view_args
+    @request_read_args
+    @request_search_args
     @response_handler()
     def get_list(self):
         """GET endpoint to return list of preservation info for a given record.
 
         Request param: **pid_id** PersistentIdentifier ID for the record.
 
+        Query params:
+
+        * **page**: Page number. (optional)
+        * **size**: Number of results per page, up to :attr:`invenio_preservation_sync.config.PRESERVATION_SYNC_MAX_PAGE_SIZE`. (optional)
+        * **after**: Keyset cursor *<created>,<id>* of the last result of the previous page, taken from the *next* link. (optional)
+        * **fields**: Comma separated names of the fields to return. (optional)
+
         :returns: Response status code, see *message* for more details
 
-        * **200** - List of preservations (*hits, hits*) and total number of results (*hits, total*).
+        * **200** - List of preservations (*hits, hits*) and total number of results (*hits, total*), omitted when paginating with a cursor.
             * If there are no preservation info for the given Persistent ID then it returns an empty list.
+            * The *links, next* URL points to the next page, if any.
+        * **304** - Page did not change since the *If-None-Match* / *If-Modified-Since* request headers.
         * **400** - Params were not valid.
         * **403** - Permission requirement was not met.
         * **404** - PID could not be resolved or the module is disabled.
         * **503** - Mandatory config was missing.
         """
         pid_id = resource_requestctx.view_args["pid_id"]
-        preservations = self.service.read(g.identity, pid_id)
-        return preservations.to_dict(), 200
+        args = resource_requestctx.args
+        preservations = self.service.read(
+            g.identity,
+            pid_id,
+            page=args.get("page", 1),
+            size=args.get("size"),
+            after=args.get("after"),
+            fields=self._requested_fields(),
+        )
+        if self._is_not_modified(preservations):
+            return None, 304
+        res = preservations.to_dict()
+        res["links"] = self._list_links(preservations.next_params)
+        return res, 200
+
+    @request_filter_args
+    @request_search_args
+    @response_handler()
+    def search(self):
+        """GET endpoint to search the preservation infos of all the records.
+
+        Query params:
+
+        * **status**, **revision_id**, the date ranges and the description, as for the export. (optional)
+        * **size**: Number of results per page, up to :attr:`invenio_preservation_sync.config.PRESERVATION_SYNC_MAX_PAGE_SIZE`. (optional)
+        * **after**: Keyset cursor of the last result of the previous page, taken from the *next* link. (optional)
+
+        :returns: Response status code, see *message* for more details
+
+        * **200** - List of preservations (*hits, hits*) with their *object_uuid*, latest first.
+            * The *links, next* URL points to the next page, if any.
+        * **400** - Params were not valid.
+        * **403** - Permission requirement was not met.
+        * **404** - The module is disabled.
+        """
+        args = resource_requestctx.args
+        preservations = self.service.search(
+            g.identity,
+            size=args.get("size"),
+            after=args.get("after"),
+            **self._filters()
+        )
+        res = preservations.to_dict()
+        res["links"] = self._list_links(preservations.next_params)
+        return res, 200
+
+    @request_search_args
+    @response_handler()
+    def get_changes(self):
+        """GET endpoint to tail the preservation infos created or updated.
+
+        Query params:
+
+        * **size**: Number of results per page, up to :attr:`invenio_preservation_sync.config.PRESERVATION_SYNC_MAX_PAGE_SIZE`. (optional)
+        * **after**: Opaque cursor taken from the *next* link of the previous page. (optional)
+
+        :returns: Response status code, see *message* for more details
+
+        * **200** - List of preservations (*hits, hits*) ordered by update date, oldest first.
+            * The *links, next* URL resumes after the last change, it is always present so it can be polled for new changes.
+        * **400** - Params were not valid.
+        * **403** - Permission requirement was not met.
+        * **404** - The module is disabled.
+        """
+        args = resource_requestctx.args
+        preservations = self.service.read_changes(
+            g.identity, after=args.get("after"), size=args.get("size")
+        )
+        res = preservations.to_dict()
+        res["links"] = self._list_links(preservations.next_params)
+        return res, 200
+
+    @request_stats_args
+    @response_handler()
+    def get_stats(self):
+        """GET endpoint to return the number of preservation infos of each status.
+
+        Query params:
+
+        * **latest**: Count the records by the status of their latest preservation info instead. (optional)
+
+        :returns: Response status code, see *message* for more details
+
+        * **200** - Count of each status (*status*) and their *total*.
+        * **400** - Params were not valid.
+        * **403** - Permission requirement was not met.
+        * **404** - The module is disabled.
+        """
+        stats = self.service.read_stats(
+            g.identity, latest=resource_requestctx.args.get("latest", False)
+        )
+        return stats, 200
+
+    @request_filter_args
+    def export(self):
+        """GET endpoint to export the preservation infos as newline delimited JSON.
+
+        The export is streamed and gzip compressed if the client accepts it.
+
+        Query params:
+
+        * **status**: Status of the preservations, can be repeated. (optional)
+        * **revision_id**: Revision of the records. (optional)
+        * **created_from**, **created_to**: Range of creation dates, the end is excluded. (optional)
+        * **archived_from**, **archived_to**: Range of archive dates, the end is excluded. (optional)
+        * **harvested_from**, **harvested_to**: Range of harvest dates, the end is excluded. (optional)
+        * **description.<key>**: String value of a key of the description, nested keys are dotted, e.g. *description.sender.name=x*. (optional)
+
+        :returns: Response status code, see *message* for more details
+
+        * **200** - Preservations as *application/x-ndjson*, one per line.
+        * **400** - Params were not valid.
+        * **403** - Permission requirement was not met.
+        * **404** - The module is disabled.
+        """
+        lines = self.service.export(g.identity, **self._filters())
+        headers = {}
+        if "gzip" in request.accept_encodings:
+            lines = _gzip(lines)
+            headers["Content-Encoding"] = "gzip"
+        return Response(
+            stream_with_context(lines),
+            mimetype="application/x-ndjson",
+            headers=headers,
+        )
+
+    def _filters(self):
+        """Return the filters of the request, including the description ones."""
+        args = resource_requestctx.args
+        filters = {
+            name: args[name] for name in self.config.request_filter_args if name in args
+        }
+        description = {
+            name[len("description.") :]: value
+            for name, value in request.args.items()
+            if name.startswith("description.")
+        }
+        if description:
+            filters["description"] = description
+        return filters
+
+    def _requested_fields(self):
+        """Return the names of the fields requested with the ``fields`` param."""
+        fields = resource_requestctx.args.get("fields")
+        if not fields:
+            return None
+        return [name.strip() for name in fields.split(",") if name.strip()]
+
+    def _is_not_modified(self, result):
+        """Set the cache validators of the response and evaluate the request ones.
+
+        The ``ETag`` and ``Last-Modified`` headers are derived from the ids and
+        update dates of the preservation infos, so the check does not need to
+        serialize them.
+
+        :returns: ``True`` if the client's copy is still valid.
+        """
+        etag = result.etag
+        last_modified = result.last_modified
+
+        @after_this_request
+        def set_validators(response):
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            return response
+
+        if request.if_none_match:
+            return request.if_none_match.contains(etag)
+        if last_modified and request.if_modified_since:
+            return last_modified.replace(microsecond=0) <= request.if_modified_since
+        return False
+
+    def _list_links(self, next_params):
+        """Return the links of a page of preservation infos.
+
+        The *next* link keeps the filters and the fields of the request.
+        """
+        view_args = request.view_args
+        args = request.args.to_dict(flat=False)
+        links = {"self": url_for(request.endpoint, **view_args, **args, _external=True)}
+        if next_params:
+            for param in ("page", "size", "after"):
+                args.pop(param, None)
+            links["next"] = url_for(
+                request.endpoint, **view_args, **args, **next_params, _external=True
+            )
+        return links
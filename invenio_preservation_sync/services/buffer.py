@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Group commit of the writes of concurrent requests."""
+
+import threading
+import time
+
+from flask import current_app
+
+
+class _Write(object):
+    """Write waiting in the buffer."""
+
+    def __init__(self, item):
+        """Constructor."""
+        self.item = item
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class WriteBuffer(object):
+    """Buffer of writes flushed together in a single transaction.
+
+    The writes are collected until ``max_size`` of them are pending or the
+    oldest one has waited ``max_delay`` milliseconds, then a background thread
+    flushes them at once. Each caller is blocked until its write is flushed.
+
+    If the flush fails, the writes are flushed again one by one, so that a
+    faulty write only fails its own caller.
+    """
+
+    def __init__(self, flush, max_size=100, max_delay=10, timeout=30):
+        """Constructor.
+
+        :param flush: Function called in an application context with the list
+            of buffered items, returning the list of their results.
+        :param max_size: Maximum number of items flushed together.
+        :param max_delay: Milliseconds the first item waits for others.
+        :param timeout: Seconds a caller waits for its write to be flushed.
+        """
+        self.flush = flush
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.flushes = 0
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, item):
+        """Buffer an item and wait until it is flushed.
+
+        :returns: Result of the item.
+        :raises TimeoutError: If the item was not flushed in time. It is not
+            written anymore if it was still waiting in the buffer.
+        :raises Exception: The error of the flush of the item.
+        """
+        write = _Write(item)
+        with self._condition:
+            self._start()
+            self._pending.append(write)
+            self._condition.notify()
+        if not write.done.wait(self.timeout):
+            with self._condition:
+                if write in self._pending:
+                    self._pending.remove(write)
+            raise TimeoutError("The buffered write was not flushed in time.")
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _start(self):
+        """Start the flushing thread, bound to the current application."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(current_app._get_current_object(),),
+                name="preservation-sync-write-buffer",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _take(self):
+        """Wait for the next writes to flush."""
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            deadline = self._pending[0].submitted + self.max_delay / 1000
+            while len(self._pending) < self.max_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                self._condition.wait(timeout)
+            writes = self._pending[: self.max_size]
+            del self._pending[: self.max_size]
+            return writes
+
+    def _run(self, app):
+        """Flush the writes as they come."""
+        while True:
+            writes = self._take()
+            with app.app_context():
+                self._flush(app, writes)
+            for write in writes:
+                write.done.set()
+
+    def _flush(self, app, writes):
+        """Flush the writes together, or one by one if that fails."""
+        self.flushes += 1
+        try:
+            results = self.flush([write.item for write in writes])
+        except Exception as e:
+            if len(writes) > 1:
+                for write in writes:
+                    self._flush(app, [write])
+                return
+            app.logger.exception("Could not flush the buffered write.")
+            writes[0].error = e
+        else:
+            for write, result in zip(writes, results):
+                write.result = result
@@ -8,10 +8,14 @@
 
 """Configs for the service layer to process the Preservation Sync requests."""
 
-from ..models import PreservationInfoModel
+from ..models import PreservationInfoLatestModel, PreservationInfoModel
 from .permissions import DefaultPreservationInfoPermissionPolicy
 from .results import PreservationInfoItem, PreservationInfoList
-from .schemas import PreservationInfoSchema
+from .schemas import (
+    PreservationInfoExportSchema,
+    PreservationInfoLatestManySchema,
+    PreservationInfoSchema,
+)
 
 
 class PreservationInfoServiceConfig(object):
@@ -21,5 +25,9 @@ class PreservationInfoServiceConfig(object):
     result_list_cls = PreservationInfoList
     permission_policy_cls = DefaultPreservationInfoPermissionPolicy
     schema = PreservationInfoSchema()
+    latest_many_schema = PreservationInfoLatestManySchema()
+    export_schema = PreservationInfoExportSchema()
+    search_schema = PreservationInfoExportSchema()
 
     record_cls = PreservationInfoModel
+    latest_cls = PreservationInfoLatestModel
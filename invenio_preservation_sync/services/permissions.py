@@ -32,3 +32,5 @@ class DefaultPreservationInfoPermissionPolicy(BasePermissionPolicy):
 
     can_create = [Archiver(), SystemProcess()]
     can_read = [Archiver(), SystemProcess()]
+    can_search = [Archiver(), SystemProcess()]
+    can_export = [Archiver(), SystemProcess()]
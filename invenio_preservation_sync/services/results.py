@@ -8,8 +8,23 @@
 
 """Service results."""
 
+import hashlib
+from datetime import timezone
+
 from flask_sqlalchemy.pagination import Pagination
 
+from .schemas import compile_dump
+
+
+def _etag(*parts):
+    """Return an entity tag computed from the given parts."""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _last_modified(obj):
+    """Return the UTC last modification date of a preservation info."""
+    return obj.updated.replace(tzinfo=timezone.utc)
+
 
 class PreservationInfoItem(object):
     """PreservationInfo result item."""
@@ -35,6 +50,16 @@ class PreservationInfoItem(object):
 
         return self._data
 
+    @property
+    def etag(self):
+        """Entity tag of the preservation info, derived from its id and update date."""
+        return _etag(self._obj.id, self._obj.updated.isoformat())
+
+    @property
+    def last_modified(self):
+        """Last modification date of the preservation info."""
+        return _last_modified(self._obj)
+
     def to_dict(self):
         """Get a dictionary for the preservation info result."""
         res = self.data
@@ -46,32 +71,71 @@ class PreservationInfoItem(object):
 class PreservationInfoList(object):
     """List of preservation info results."""
 
-    def __init__(self, results, errors=None, links_tpl=None, schema=None):
-        """Constructor."""
+    _no_total = object()
+
+    def __init__(
+        self,
+        results,
+        errors=None,
+        links_tpl=None,
+        schema=None,
+        next_params=None,
+        total=_no_total,
+        pids=None,
+    ):
+        """Constructor.
+
+        :param next_params: Request params to get the next page, if any.
+        :param pids: PIDs of the records of the results, added to each hit.
+        :param total: Overrides the total number of results, ``None`` to omit
+            it (e.g. for keyset pagination where counting would scan the table).
+        """
         self._results = results
         self._errors = errors
         self._links_tpl = links_tpl
         self._schema = schema
+        self._dump = compile_dump(schema)
+        self._total = total
+        self.next_params = next_params
+        self._pids = pids
 
     @property
     def hits(self):
         """Iterator over the hits."""
-        for obj in self.preservation_info_result():
-            projection = self._schema.dump(obj)
+        for index, obj in enumerate(self.preservation_info_result()):
+            projection = self._dump(obj)
+            if self._pids:
+                projection["pid"] = self._pids[index]
 
             if self._links_tpl:
                 projection["links"] = self._links_tpl.expand(self._identity, obj)
 
             yield projection
 
+    @property
+    def etag(self):
+        """Entity tag of the list, derived from the ids and update dates of its hits."""
+        return _etag(
+            self.total,
+            *(
+                f"{obj.id}:{obj.updated.isoformat()}"
+                for obj in self.preservation_info_result()
+            ),
+        )
+
+    @property
+    def last_modified(self):
+        """Latest modification date of the hits, ``None`` if there are none."""
+        return max(
+            (_last_modified(obj) for obj in self.preservation_info_result()),
+            default=None,
+        )
+
     def to_dict(self):
         """Return result as a dictionary."""
-        res = {
-            "hits": {
-                "hits": list(self.hits),
-                "total": self.total,
-            }
-        }
+        res = {"hits": {"hits": list(self.hits)}}
+        if self.total is not None:
+            res["hits"]["total"] = self.total
 
         if self._errors:
             res["errors"] = self._errors
@@ -81,6 +145,8 @@ class PreservationInfoList(object):
     @property
     def total(self):
         """Get total number of results."""
+        if self._total is not self._no_total:
+            return self._total
         return (
             self._results.total
             if isinstance(self._results, Pagination)
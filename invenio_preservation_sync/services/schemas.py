@@ -8,9 +8,10 @@
 
 """Schema class for the Preservation Info object."""
 
-from datetime import timezone
+from datetime import datetime, timezone
 
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
 from marshmallow_utils.fields import TZDateTime
 
 from ..models import PreservationStatus
@@ -28,3 +29,84 @@ class PreservationInfoSchema(Schema):
     path = fields.String(allow_none=True)
     description = fields.Dict(allow_none=True)
     event_id = fields.UUID(dump_only=True)
+
+
+class PreservationInfoExportSchema(PreservationInfoSchema):
+    """Schema for a Preservation Info object in an export."""
+
+    id = fields.UUID(dump_only=True)
+    object_uuid = fields.UUID(dump_only=True)
+    created = TZDateTime(timezone=timezone.utc, format="iso", dump_only=True)
+    updated = TZDateTime(timezone=timezone.utc, format="iso", dump_only=True)
+
+
+class PreservationInfoLatestManySchema(Schema):
+    """Schema for reading the latest preservation info of many records."""
+
+    pids = fields.List(fields.String(), required=True)
+
+
+def _fast_serializer(field):
+    """Return a function serializing a non null value like the field does.
+
+    :returns: The function, or ``None`` if the field is not one of the plain
+        field types used by the schemas of this module.
+    """
+    field_type = type(field)
+    if field_type in (fields.String, fields.UUID):
+        return str
+    if field_type is fields.Integer and not field.as_string:
+        return int
+    if field_type is fields.Dict and not (field.key_field or field.value_field):
+        return dict
+    if field_type is fields.Enum and type(field.field) is fields.Raw:
+        if field.by_value:
+            return lambda value: value.value
+        return lambda value: value.name
+    if field_type is TZDateTime and field.format == "iso":
+        tz = field.timezone
+
+        def serialize_datetime(value):
+            if isinstance(value, datetime):
+                return value.replace(tzinfo=tz).isoformat()
+            return field._serialize(value, None, None)
+
+        return serialize_datetime
+    return None
+
+
+def compile_dump(schema):
+    """Compile a function dumping an object with the same output as the schema.
+
+    The plain fields are serialized with a precomputed converter instead of
+    going through the marshmallow field machinery, the other fields fall back
+    to ``Field.serialize``. Schemas with dump hooks are not compiled.
+
+    :param schema: Schema instance, ``only`` and ``exclude`` are honoured.
+    :returns: Function taking an object (not a mapping) and returning a dict.
+    """
+    if schema.many or schema._hooks[PRE_DUMP] or schema._hooks[POST_DUMP]:
+        return schema.dump
+
+    plan = []
+    for name, field in schema.dump_fields.items():
+        attr = field.attribute or name
+        serialize = None
+        if field.dump_default is missing and "." not in attr:
+            serialize = _fast_serializer(field)
+        plan.append((field.data_key or name, name, attr, field, serialize))
+
+    def dump(obj):
+        data = {}
+        for key, name, attr, field, serialize in plan:
+            if serialize is None:
+                value = field.serialize(name, obj, accessor=schema.get_attribute)
+            else:
+                value = getattr(obj, attr, missing)
+                if value is not None and value is not missing:
+                    value = serialize(value)
+            if value is not missing:
+                data[key] = value
+        return data
+
+    return dump
@@ -8,34 +8,219 @@
 
 """Service layer to process the Preservation Sync requests."""
 
+import base64
+import binascii
+import json
+import re
+import uuid
+from datetime import datetime, timedelta
 
 from flask import current_app
+from invenio_access.permissions import system_identity
 from invenio_db.uow import ModelCommitOp, unit_of_work
+from invenio_pidstore.errors import PIDDoesNotExistError
+from marshmallow import ValidationError
 
-from ..errors import PermissionDeniedError
+from ..errors import (
+    BatchTooLargeError,
+    PermissionDeniedError,
+    PreservationAlreadyReceivedError,
+    PreservationInfoNotFoundError,
+)
+from ..models import PreservationStatus, _timestamp
+from .buffer import WriteBuffer
+from .schemas import compile_dump
+from .uow import CacheDeleteOp
+
+_description_path = re.compile(r"^[\w-]+(\.[\w-]+)*$")
+"""Dotted key path accepted by the description filter."""
+
+_large_fields = ("description",)
+"""Columns only loaded from the database when their field is requested."""
+
+
+def _preservation_key(object_uuid, data):
+    """Return the key identifying a preservation info of a record."""
+    return (
+        object_uuid,
+        data.get("revision_id"),
+        _timestamp(data, "archive_timestamp"),
+    )
+
+
+def _format_cursor(obj):
+    """Return the keyset cursor pointing after the given preservation info."""
+    return f"{obj.created.isoformat()},{obj.id}"
+
+
+def _parse_cursor(cursor):
+    """Parse a keyset cursor into its ``(created, id)`` tuple."""
+    try:
+        created, id_ = cursor.split(",")
+        return datetime.fromisoformat(created), uuid.UUID(id_)
+    except ValueError:
+        raise ValidationError("Invalid cursor.", field_name="after")
+
+
+def _validate_description_filter(description):
+    """Validate the dotted key paths of a description filter."""
+    for path in description or {}:
+        if not _description_path.match(path):
+            raise ValidationError("Invalid key path.", field_name=f"description.{path}")
+
+
+def _format_changes_cursor(obj):
+    """Return the opaque change feed cursor pointing after the preservation info."""
+    cursor = f"{obj.updated.isoformat()},{obj.id}"
+    return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
+def _parse_changes_cursor(cursor):
+    """Parse an opaque change feed cursor into its ``(updated, id)`` tuple."""
+    try:
+        updated, id_ = base64.urlsafe_b64decode(cursor).decode().split(",")
+        return datetime.fromisoformat(updated), uuid.UUID(id_)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError("Invalid cursor.", field_name="after")
+
+
+def _render_cache_key(object_uuid):
+    """Return the render cache key of a record."""
+    return f"preservation-sync:render:{object_uuid}"
+
+
+def _missing_cache_key(object_uuid):
+    """Return the missing cache key of a record."""
+    return f"preservation-sync:missing:{object_uuid}"
+
+
+def _stats_cache_key(latest):
+    """Return the stats cache key of all or of the latest preservation infos."""
+    return f"preservation-sync:stats:{'latest' if latest else 'all'}"
+
+
+def _batch_item_result(pid, status, message):
+    """Return the result entry of a single item of a batch."""
+    return {"pid": pid, "status": status, "message": message}
 
 
 class PreservationInfoService(object):
     """Invenio Preservation Sync service."""
 
-    def __init__(self, config=None, perm_policy_cls=None):
+    def __init__(
+        self,
+        config=None,
+        perm_policy_cls=None,
+        pid_cache=None,
+        render_cache=None,
+        missing_cache=None,
+        stats_cache=None,
+        idempotency_cache=None,
+        write_buffer_size=0,
+        write_buffer_delay=10,
+        write_buffer_timeout=30,
+    ):
         """Configuration."""
         self.record_cls = config.record_cls
+        self.latest_cls = config.latest_cls
         self.result_item = config.result_item_cls
         self.result_list = config.result_list_cls
         self.schema = config.schema
+        self.latest_many_schema = config.latest_many_schema
+        self.export_schema = config.export_schema
+        self.search_schema = config.search_schema
         self.permission_policy = config.permission_policy_cls
         if perm_policy_cls:
             self.permission_policy = perm_policy_cls
+        self.pid_cache = pid_cache
+        self.render_cache = render_cache
+        self.missing_cache = missing_cache
+        self.stats_cache = stats_cache
+        self.idempotency_cache = idempotency_cache
+        self.write_buffer = None
+        if write_buffer_size > 1:
+            self.write_buffer = WriteBuffer(
+                self._flush_writes,
+                write_buffer_size,
+                write_buffer_delay,
+                write_buffer_timeout,
+            )
+        self._pid_resolver = None
+        self._field_schemas = {}
 
     @property
     def pid_resolver(self):
         """Return the pid resolver function."""
-        pid_resolver_config_str = "PRESERVATION_SYNC_PID_RESOLVER"
-        assert current_app.config[pid_resolver_config_str], (
-            "Missing config: " + pid_resolver_config_str
-        )
-        return current_app.config[pid_resolver_config_str]
+        if self._pid_resolver is None:
+            pid_resolver_config_str = "PRESERVATION_SYNC_PID_RESOLVER"
+            assert current_app.config[pid_resolver_config_str], (
+                "Missing config: " + pid_resolver_config_str
+            )
+            self._pid_resolver = current_app.config[pid_resolver_config_str]
+        return self._pid_resolver
+
+    def resolve_pid(self, pid):
+        """Resolve a pid to its object uuid, going through the pid cache."""
+        object_uuid = self.pid_cache.get(pid) if self.pid_cache is not None else None
+        if object_uuid is None:
+            try:
+                object_uuid = self.pid_resolver(pid)
+            except PIDDoesNotExistError:
+                self._cache_pid(pid, False)
+                raise
+            self._cache_pid(pid, object_uuid)
+        elif object_uuid is False:
+            raise PIDDoesNotExistError(None, pid)
+        return object_uuid
+
+    def resolve_pids(self, pids):
+        """Resolve many pids at once, going through the pid cache.
+
+        The cache misses are resolved with a single call to the
+        ``PRESERVATION_SYNC_PID_BATCH_RESOLVER`` if it is configured.
+
+        :returns: Dictionary of pid to object uuid, without the unresolved pids.
+        """
+        object_uuids = {}
+        missing = []
+        for pid in set(pids):
+            object_uuid = (
+                self.pid_cache.get(pid) if self.pid_cache is not None else None
+            )
+            if object_uuid is None:
+                missing.append(pid)
+            elif object_uuid is not False:
+                object_uuids[pid] = object_uuid
+
+        if missing:
+            batch_resolver = current_app.config["PRESERVATION_SYNC_PID_BATCH_RESOLVER"]
+            if batch_resolver:
+                resolved = batch_resolver(missing)
+            else:
+                resolved = {}
+                for pid in missing:
+                    try:
+                        resolved[pid] = self.pid_resolver(pid)
+                    except PIDDoesNotExistError:
+                        pass
+            for pid in missing:
+                object_uuid = resolved.get(pid)
+                if object_uuid is None:
+                    self._cache_pid(pid, False)
+                else:
+                    self._cache_pid(pid, object_uuid)
+                    object_uuids[pid] = object_uuid
+
+        return object_uuids
+
+    def _cache_pid(self, pid, object_uuid):
+        """Cache a resolved pid, ``False`` caches that it does not exist."""
+        if self.pid_cache is None:
+            return
+        timeout = None
+        if object_uuid is False:
+            timeout = current_app.config["PRESERVATION_SYNC_PID_CACHE_NEGATIVE_TTL"]
+        self.pid_cache.set(pid, object_uuid, timeout=timeout)
 
     def check_permission(self, identity, action_name, **kwargs):
         """Check a permission against the identity."""
@@ -57,36 +242,444 @@ class PreservationInfoService(object):
         """Process the preservation event info."""
         valid_data = self.schema.load(data)
 
-        object_uuid = self.pid_resolver(valid_data.get("pid"))
+        object_uuid = self.resolve_pid(valid_data.get("pid"))
 
         self.require_permission(identity, "create")
 
-        existing_preservation = self.record_cls.get_existing_preservation(
-            object_uuid=object_uuid, data=valid_data
+        self.record_cls.lock([object_uuid])
+        preservation, created = self.record_cls.create_or_update(
+            object_uuid=object_uuid, data=valid_data, event_id=event_id
         )
-
-        if existing_preservation:
-            preservation = self.record_cls.update_existing_preservation(
-                obj=existing_preservation,
-                data=valid_data,
-                event_id=event_id,
-            )
-        else:
-            preservation = self.record_cls.create(
-                object_uuid=object_uuid, data=valid_data, event_id=event_id
-            )
+        if created:
+            uow.register(ModelCommitOp(self.latest_cls.set(preservation)))
 
         uow.register(ModelCommitOp(preservation))
+        self._invalidate_caches(uow, [object_uuid])
         return self.result_item(preservation, schema=self.schema)
 
-    def read(self, identity, id, latest=False):
-        """Returns preservation info based on the record id."""
-        object_uuid = self.pid_resolver(id)
+    def create_or_update_buffered(self, identity, data, event_id=None):
+        """Process the preservation event info as part of a group commit.
+
+        The info is validated and the permission checked right away, then it is
+        written in one transaction with the other buffered infos, see
+        ``PRESERVATION_SYNC_WRITE_BUFFER_SIZE``. Returns once it is committed.
+
+        :returns: The ``{"pid", "status", "message"}`` entry of the info.
+        """
+        self.schema.load(data)
+        self.require_permission(identity, "create")
+        return self.write_buffer.submit((data, event_id))
+
+    def _flush_writes(self, writes):
+        """Write the buffered preservation event infos, already authorized."""
+        data, event_ids = zip(*writes)
+        return self.create_or_update_many(
+            system_identity, list(data), event_ids=list(event_ids)
+        )
+
+    @unit_of_work()
+    def create_or_update_many(
+        self,
+        identity,
+        data,
+        event_id=None,
+        event_ids=None,
+        uow=None,
+    ):
+        """Process a batch of preservation event infos.
+
+        Each item is validated and applied on its own, while the PIDs are
+        resolved once per distinct value, the existing preservation infos are
+        fetched with a single query and all writes share one unit of work.
+
+        :param event_ids: Event of each item, instead of ``event_id`` for all.
+        :returns: List with a ``{"pid", "status", "message"}`` entry per item.
+        """
+        max_size = current_app.config["PRESERVATION_SYNC_BATCH_MAX_SIZE"]
+        if len(data) > max_size:
+            raise BatchTooLargeError(size=len(data), max_size=max_size)
+        if event_ids is None:
+            event_ids = [event_id] * len(data)
+
+        self.require_permission(identity, "create")
+
+        results = [None] * len(data)
+        valid_items = []
+        for index, item in enumerate(data):
+            try:
+                valid_items.append((index, self.schema.load(item)))
+            except ValidationError as e:
+                pid = item.get("pid") if isinstance(item, dict) else None
+                results[index] = _batch_item_result(pid, 400, str(e))
+
+        object_uuids = self.resolve_pids(
+            valid_data["pid"] for _, valid_data in valid_items
+        )
+
+        self.record_cls.lock(object_uuids.values())
+        existing_preservations = self.record_cls.get_existing_preservations(
+            _preservation_key(object_uuids[valid_data["pid"]], valid_data)
+            for _, valid_data in valid_items
+            if valid_data["pid"] in object_uuids
+        )
+
+        created_preservations = []
+        for index, valid_data in valid_items:
+            pid = valid_data["pid"]
+            if pid not in object_uuids:
+                error = PIDDoesNotExistError(None, pid)
+                results[index] = _batch_item_result(pid, 404, str(error))
+                continue
+
+            object_uuid = object_uuids[pid]
+            key = _preservation_key(object_uuid, valid_data)
+            existing_preservation = existing_preservations.get(key)
+            try:
+                if existing_preservation:
+                    preservation = self.record_cls.update_existing_preservation(
+                        obj=existing_preservation,
+                        data=valid_data,
+                        event_id=event_ids[index],
+                    )
+                else:
+                    preservation = self.record_cls.create(
+                        object_uuid=object_uuid,
+                        data=valid_data,
+                        event_id=event_ids[index],
+                    )
+                    created_preservations.append(preservation)
+            except PreservationAlreadyReceivedError as e:
+                results[index] = _batch_item_result(pid, 409, str(e))
+                continue
+
+            if key[1] is not None and key[2] is not None:
+                # Later items of the same batch must see this preservation
+                existing_preservations[key] = preservation
+            uow.register(ModelCommitOp(preservation))
+            results[index] = _batch_item_result(pid, 202, "Accepted.")
+
+        for latest in self.latest_cls.set_many(created_preservations):
+            uow.register(ModelCommitOp(latest))
+        self._invalidate_caches(uow, object_uuids.values())
+
+        return results
+
+    def read_latest_status(self, identity, object_uuid):
+        """Returns the status of the latest preservation info of a record.
+
+        The status is served from the render cache, which is invalidated when
+        the record's preservation infos are written. Only the writing process
+        sees the invalidation unless the cache is shared between processes, see
+        ``PRESERVATION_SYNC_RENDER_CACHE``.
+
+        :returns: The :class:`~invenio_preservation_sync.models.PreservationStatus`
+            value, or ``None`` if the record has no preservation info.
+        """
+        self.require_permission(identity, "read")
+
+        key = _render_cache_key(object_uuid)
+        status = self.render_cache.get(key) if self.render_cache is not None else None
+        if status is None:
+            try:
+                preservation = self._get_latest(object_uuid, defer=_large_fields)
+            except PreservationInfoNotFoundError:
+                return None
+            status = str(preservation.status)
+            if self.render_cache is not None:
+                self.render_cache.set(
+                    key,
+                    status,
+                    timeout=current_app.config["PRESERVATION_SYNC_RENDER_CACHE_TTL"],
+                )
+        return status
+
+    def read(
+        self,
+        identity,
+        id,
+        latest=False,
+        page=None,
+        size=None,
+        after=None,
+        fields=None,
+    ):
+        """Returns preservation info based on the record id.
+
+        The list of preservation infos is paginated when ``page``, ``size`` or
+        the ``after`` keyset cursor (``<created>,<id>``, empty for the first
+        page) are given.
+
+        :param fields: Names of the fields to return, all of them if empty.
+        """
+        schema, defer = self._fields_schema(fields)
+        object_uuid = self.resolve_pid(id)
 
         self.require_permission(identity, "read")
 
-        preservation = self.record_cls.get(object_uuid, latest=latest, pid=id)
         if latest:
-            return self.result_item(preservation, schema=self.schema)
-        else:
-            return self.result_list(preservation, schema=self.schema)
+            preservation = self._get_latest(object_uuid, pid=id, defer=defer)
+            return self.result_item(preservation, schema=schema)
+
+        if page is None and size is None and after is None:
+            preservations = self.record_cls.get(object_uuid, defer=defer)
+            return self.result_list(preservations, schema=schema)
+
+        size = self._page_size(size)
+        if after is None:
+            preservations = self.record_cls.get_page(
+                object_uuid, page=page or 1, size=size, defer=defer
+            )
+            next_params = None
+            if preservations.has_next:
+                next_params = {"page": preservations.next_num, "size": size}
+            return self.result_list(
+                preservations, schema=schema, next_params=next_params
+            )
+
+        preservations = self.record_cls.get_after(
+            object_uuid,
+            after=_parse_cursor(after) if after else None,
+            size=size + 1,
+            defer=defer,
+        )
+        next_params = None
+        if len(preservations) > size:
+            preservations = preservations[:size]
+            next_params = {"after": _format_cursor(preservations[-1]), "size": size}
+        return self.result_list(
+            preservations, schema=schema, next_params=next_params, total=None
+        )
+
+    def read_latest_many(self, identity, data, fields=None):
+        """Returns the latest preservation info of many records at once.
+
+        The permission is checked once, the pids are resolved in bulk and the
+        latest preservation infos are fetched with a single query.
+
+        :param data: Request body with the list of ``pids``.
+        :param fields: Names of the fields to return, all of them if empty.
+        """
+        schema, defer = self._fields_schema(fields)
+        pids = list(dict.fromkeys(self.latest_many_schema.load(data)["pids"]))
+        max_size = current_app.config["PRESERVATION_SYNC_BATCH_MAX_SIZE"]
+        if len(pids) > max_size:
+            raise BatchTooLargeError(size=len(pids), max_size=max_size)
+
+        self.require_permission(identity, "read")
+
+        object_uuids = self.resolve_pids(pids)
+        lookup = [
+            object_uuid
+            for object_uuid in object_uuids.values()
+            if not self._is_missing(object_uuid)
+        ]
+        latest = self.record_cls.get_latest_many(lookup, defer=defer)
+        for object_uuid in lookup:
+            if object_uuid not in latest:
+                self._set_missing(object_uuid)
+
+        found_pids = []
+        preservations = []
+        errors = []
+        for pid in pids:
+            preservation = latest.get(object_uuids.get(pid))
+            if preservation is None:
+                error = PreservationInfoNotFoundError(pid=pid)
+                errors.append({"pid": pid, "message": error.message})
+            else:
+                found_pids.append(pid)
+                preservations.append(preservation)
+
+        return self.result_list(
+            preservations, errors=errors, schema=schema, pids=found_pids
+        )
+
+    def search(self, identity, size=None, after=None, **filters):
+        """Search the preservation infos of all the records.
+
+        The results are ordered by creation date, latest first, and paginated
+        with the ``after`` keyset cursor (``<created>,<id>``).
+
+        :param filters: Status, revision and date range filters, see
+            :meth:`~invenio_preservation_sync.models.PreservationInfoModel.filter_query`.
+        """
+        self.require_permission(identity, "search")
+
+        _validate_description_filter(filters.get("description"))
+        size = self._page_size(size)
+        preservations = self.record_cls.search(
+            after=_parse_cursor(after) if after else None, size=size + 1, **filters
+        )
+        next_params = None
+        if len(preservations) > size:
+            preservations = preservations[:size]
+            next_params = {"after": _format_cursor(preservations[-1]), "size": size}
+        return self.result_list(
+            preservations,
+            schema=self.search_schema,
+            next_params=next_params,
+            total=None,
+        )
+
+    def read_changes(self, identity, after=None, size=None):
+        """Returns the preservation infos created or updated after a cursor.
+
+        The changes are ordered by update date and id, oldest first. The
+        returned ``next_params`` always hold the cursor to resume from, so a
+        consumer can keep polling it to tail the changes.
+
+        :param after: Opaque cursor taken from a previous page, ``None`` to
+            start from the first preservation info.
+        """
+        self.require_permission(identity, "search")
+
+        size = self._page_size(size)
+        cursor = _parse_changes_cursor(after) if after else None
+        until = datetime.utcnow() - timedelta(
+            seconds=current_app.config["PRESERVATION_SYNC_CHANGES_DELAY"]
+        )
+        preservations = self.record_cls.get_changes(
+            after=cursor, until=until, size=size
+        )
+        if preservations:
+            after = _format_changes_cursor(preservations[-1])
+        next_params = {"size": size}
+        if after:
+            next_params["after"] = after
+        return self.result_list(
+            preservations,
+            schema=self.search_schema,
+            next_params=next_params,
+            total=None,
+        )
+
+    def read_stats(self, identity, latest=False):
+        """Returns the number of preservation infos of each status.
+
+        The counts are computed with a single query and cached for
+        ``PRESERVATION_SYNC_STATS_CACHE_TTL`` seconds, writes invalidate them.
+
+        :param latest: Count the records by the status of their latest
+            preservation info instead of counting all the preservation infos.
+        :returns: Dictionary with the count of each status and their ``total``.
+        """
+        self.require_permission(identity, "read")
+
+        key = _stats_cache_key(latest)
+        stats = self.stats_cache.get(key) if self.stats_cache is not None else None
+        if stats is None:
+            model = self.latest_cls if latest else self.record_cls
+            counts = model.count_by_status()
+            stats = {
+                "status": {
+                    status.value: counts.get(status.value, 0)
+                    for status in PreservationStatus
+                },
+                "total": sum(counts.values()),
+            }
+            if self.stats_cache is not None:
+                self.stats_cache.set(key, stats)
+        return stats
+
+    def export(self, identity, **filters):
+        """Export the preservation infos as newline delimited JSON.
+
+        The permission is checked when called, the returned generator then
+        streams the preservation infos in constant memory.
+
+        :param filters: Status and date range filters, see
+            :meth:`~invenio_preservation_sync.models.PreservationInfoModel.filter_query`.
+        :returns: Generator of JSON lines, one per preservation info.
+        """
+        self.require_permission(identity, "export")
+        _validate_description_filter(filters.get("description"))
+        preservations = self.record_cls.export(
+            batch_size=current_app.config["PRESERVATION_SYNC_EXPORT_BATCH_SIZE"],
+            **filters,
+        )
+        dump = compile_dump(self.export_schema)
+        return (json.dumps(dump(obj)) + "\n" for obj in preservations)
+
+    def _get_latest(self, object_uuid, pid=None, defer=()):
+        """Return the latest preservation info, going through the missing cache.
+
+        Records remembered as having no preservation info raise
+        :class:`PreservationInfoNotFoundError` without querying the database.
+        """
+        if self._is_missing(object_uuid):
+            raise PreservationInfoNotFoundError(pid=pid)
+        try:
+            return self.record_cls.get(object_uuid, latest=True, pid=pid, defer=defer)
+        except PreservationInfoNotFoundError:
+            self._set_missing(object_uuid)
+            raise
+
+    def _is_missing(self, object_uuid):
+        """Whether the record is cached as having no preservation info."""
+        if self.missing_cache is None:
+            return False
+        return self.missing_cache.get(_missing_cache_key(object_uuid)) is not None
+
+    def _set_missing(self, object_uuid):
+        """Remember that the record has no preservation info."""
+        if self.missing_cache is not None:
+            self.missing_cache.set(
+                _missing_cache_key(object_uuid),
+                True,
+                timeout=current_app.config["PRESERVATION_SYNC_MISSING_CACHE_TTL"],
+            )
+
+    def forget_missing(self, object_uuids):
+        """Forget the given records cached as having no preservation info.
+
+        Only the entries of this process are forgotten, unless
+        ``PRESERVATION_SYNC_MISSING_CACHE`` is a shared cache.
+        """
+        if self.missing_cache is not None:
+            for object_uuid in object_uuids:
+                self.missing_cache.delete(_missing_cache_key(object_uuid))
+
+    def _invalidate_caches(self, uow, object_uuids):
+        """Invalidate the cached entries of the given records after commit."""
+        object_uuids = list(object_uuids)
+        if self.render_cache is not None:
+            keys = [_render_cache_key(object_uuid) for object_uuid in object_uuids]
+            uow.register(CacheDeleteOp(self.render_cache, keys))
+        if self.missing_cache is not None:
+            keys = [_missing_cache_key(object_uuid) for object_uuid in object_uuids]
+            uow.register(CacheDeleteOp(self.missing_cache, keys))
+        if self.stats_cache is not None:
+            keys = [_stats_cache_key(latest) for latest in (False, True)]
+            uow.register(CacheDeleteOp(self.stats_cache, keys))
+
+    def _fields_schema(self, fields):
+        """Return the schema narrowed to the given fields and the columns to defer.
+
+        :returns: Tuple of the schema and of the names of the large columns
+            that are not requested, so they are not loaded from the database.
+        """
+        if not fields:
+            return self.schema, ()
+        fields = frozenset(fields)
+        unknown = fields - set(self.schema.dump_fields)
+        if unknown:
+            raise ValidationError(
+                f"Unknown fields: {', '.join(sorted(unknown))}.", field_name="fields"
+            )
+        schema = self._field_schemas.get(fields)
+        if schema is None:
+            schema = self._field_schemas[fields] = type(self.schema)(only=fields)
+        return schema, tuple(name for name in _large_fields if name not in fields)
+
+    def _page_size(self, size):
+        """Return the page size, validated against the maximum allowed."""
+        max_size = current_app.config["PRESERVATION_SYNC_MAX_PAGE_SIZE"]
+        if size is None:
+            return min(
+                current_app.config["PRESERVATION_SYNC_DEFAULT_PAGE_SIZE"], max_size
+            )
+        if not 1 <= size <= max_size:
+            raise ValidationError(
+                f"Must be between 1 and {max_size}.", field_name="size"
+            )
+        return size
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Unit of work operations for the Preservation Sync service."""
+
+from invenio_db.uow import Operation
+
+
+class CacheDeleteOp(Operation):
+    """Delete cache keys once the transaction is committed.
+
+    Deleting after the commit prevents a concurrent reader from caching the
+    previous value again before the transaction is visible.
+    """
+
+    def __init__(self, cache, keys):
+        """Constructor."""
+        super().__init__()
+        self._cache = cache
+        self._keys = keys
+
+    def on_commit(self, uow):
+        """Delete the keys from the cache."""
+        for key in self._keys:
+            self._cache.delete(key)
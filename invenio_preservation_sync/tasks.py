@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Celery tasks for Preservation Sync module."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from celery import shared_task
+from flask import current_app
+from flask_principal import AnonymousIdentity
+from invenio_access.permissions import authenticated_user
+from invenio_access.utils import get_identity
+from invenio_accounts.models import User
+from invenio_db import db
+from invenio_webhooks.models import Event
+
+from .models import PreservationInfoModel
+
+
+def shard(object_uuid, shards):
+    """Return the shard of a record, stable across processes and restarts."""
+    return uuid.UUID(str(object_uuid)).int % shards
+
+
+def _event_identity(event):
+    """Return the identity of the user who sent the event."""
+    user = db.session.get(User, event.user_id) if event.user_id else None
+    if user is None:
+        return AnonymousIdentity()
+    identity = get_identity(user)
+    identity.provides.add(authenticated_user)
+    return identity
+
+
+@shared_task(ignore_result=True)
+def process_event(event_id, items=None):
+    """Process a preservation event received in async mode.
+
+    The outcome is written to the event, as during a synchronous request.
+
+    :param items: Indices of the items of a batch to process, defaults to all
+        of them.
+    """
+    event = db.session.get(Event, event_id)
+    event.receiver.run(event, identity=_event_identity(event), items=items)
+    db.session.commit()
+
+
+def compact(age=None, batch_size=None):
+    """Delete the superseded processing and failed preservation infos.
+
+    :param age: Days after which they are deleted, defaults to
+        ``PRESERVATION_SYNC_COMPACTION_AGE``.
+    :param batch_size: Number deleted per transaction, defaults to
+        ``PRESERVATION_SYNC_COMPACTION_BATCH_SIZE``.
+    :returns: Generator of the number of preservation infos and events deleted
+        in each committed batch.
+    """
+    if age is None:
+        age = current_app.config["PRESERVATION_SYNC_COMPACTION_AGE"]
+    if batch_size is None:
+        batch_size = current_app.config["PRESERVATION_SYNC_COMPACTION_BATCH_SIZE"]
+    created_before = datetime.now(timezone.utc) - timedelta(days=age)
+    for counts in PreservationInfoModel.compact(created_before, batch_size):
+        db.session.commit()
+        yield counts
+
+
+@shared_task(ignore_result=True)
+def compact_preservations(age=None, batch_size=None):
+    """Delete the superseded preservation infos, meant to be scheduled."""
+    preservations = events = 0
+    for deleted_preservations, deleted_events in compact(age, batch_size):
+        preservations += deleted_preservations
+        events += deleted_events
+    current_app.logger.info(
+        f"Compacted {preservations} preservation infos and {events} events."
+    )
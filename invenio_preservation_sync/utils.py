@@ -12,6 +12,7 @@ from flask import current_app, g, url_for
 from flask_principal import ActionNeed
 from invenio_access import Permission
 from invenio_i18n import lazy_gettext as _
+from invenio_pidstore.errors import PIDDoesNotExistError
 
 from invenio_preservation_sync.models import PreservationStatus
 
@@ -19,22 +20,28 @@ from .proxies import current_preservation_sync_service as service
 
 
 def preservation_info_render(record):
-    """Render the preservation info."""
-    permission = Permission(ActionNeed("superuser-access"))
-    is_superuser = permission.allows(g.identity)
+    """Render the preservation info.
 
+    The record is resolved with ``PRESERVATION_SYNC_PID_RESOLVER`` from its PID,
+    like in the other paths. The latest status comes from the service's render
+    cache, see ``PRESERVATION_SYNC_RENDER_CACHE``. The URI is only shown to
+    superusers, so it is never cached and is read from the database.
+    """
     pid = record._record.pid.pid_value
-    result = service.read(g.identity, pid, latest=True).data
-
-    if not result or result["status"] != PreservationStatus.PRESERVED:
+    try:
+        object_uuid = service.resolve_pid(pid)
+    except PIDDoesNotExistError:
+        return []
+    status = service.read_latest_status(g.identity, object_uuid)
+    if status != PreservationStatus.PRESERVED:
         return []
 
     title = current_app.config.get(
         "PRESERVATION_SYNC_UI_TITLE", _("Preservation Platform")
     )
     url = None
-    if is_superuser:
-        url = result["uri"]
+    if Permission(ActionNeed("superuser-access")).allows(g.identity):
+        url = service.read(g.identity, pid, latest=True).data["uri"]
     info_link = current_app.config.get("PRESERVATION_SYNC_UI_INFO_LINK", None)
     icon_path = current_app.config.get("PRESERVATION_SYNC_UI_ICON_PATH", None)
 
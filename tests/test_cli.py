@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""CLI tests."""
+
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from invenio_access.permissions import system_identity
+from invenio_webhooks.models import Event
+
+from invenio_preservation_sync.cli import compact, export, rebuild_latest
+from invenio_preservation_sync.errors import PreservationInfoNotFoundError
+from invenio_preservation_sync.models import (
+    PreservationInfoLatestModel,
+    PreservationInfoModel,
+)
+from invenio_preservation_sync.proxies import current_preservation_sync_service
+
+
+def test_rebuild_latest(app, db, cli_runner):
+    """Test rebuilding the latest preservation info table."""
+    service = current_preservation_sync_service
+    for revision_id, status in [(1, "P"), (2, "F")]:
+        service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "revision_id": revision_id, "status": status},
+        )
+    assert service.read(system_identity, "test_pid", latest=True).data["status"] == "F"
+
+    PreservationInfoLatestModel.query.delete()
+    with pytest.raises(PreservationInfoNotFoundError):
+        service.read(system_identity, "test_pid", latest=True)
+
+    result = cli_runner(rebuild_latest, None, "--batch-size", "1")
+    assert result.exit_code == 0, result.output
+
+    latest = service.read(system_identity, "test_pid", latest=True).data
+    assert latest["status"] == "F"
+    assert latest["revision_id"] == 2
+
+
+def test_export(app, db, cli_runner, tmp_path):
+    """Test exporting the preservation infos."""
+    service = current_preservation_sync_service
+    for revision_id, status in [(1, "P"), (2, "F"), (3, "P")]:
+        service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "revision_id": revision_id, "status": status},
+        )
+
+    result = cli_runner(export, None)
+    assert result.exit_code == 0, result.output
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert sorted(line["revision_id"] for line in lines) == [1, 2, 3]
+    assert {"id", "object_uuid", "created", "updated"} <= set(lines[0])
+
+    output = tmp_path / "export.ndjson.gz"
+    result = cli_runner(export, None, "-o", str(output), "--gzip", "-s", "P")
+    assert result.exit_code == 0, result.output
+    with gzip.open(output, "rt") as f:
+        lines = [json.loads(line) for line in f]
+    assert sorted(line["revision_id"] for line in lines) == [1, 3]
+
+    result = cli_runner(
+        export, None, "--created-from", "2000-01-01", "--created-to", "2000-01-02"
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output == ""
+
+
+def test_compact(app, db, cli_runner):
+    """Test deleting the superseded preservation infos."""
+    service = current_preservation_sync_service
+    events = [Event(receiver_id="preservation", payload={}) for _ in range(3)]
+    db.session.add_all(events)
+    db.session.commit()
+    for revision_id, status, event in [
+        (1, "I", events[0]),
+        (1, "F", events[1]),
+        (1, "P", events[2]),
+        (2, "I", events[1]),
+    ]:
+        service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "revision_id": revision_id, "status": status},
+            event_id=event.id,
+        )
+    for row in PreservationInfoModel.query.all():
+        row.created -= timedelta(days=60)
+    db.session.commit()
+
+    result = cli_runner(compact, None, "--age", "90")
+    assert result.exit_code == 0, result.output
+    assert PreservationInfoModel.query.count() == 4
+
+    result = cli_runner(compact, None, "--batch-size", "1")
+    assert result.exit_code == 0, result.output
+    assert "Deleted 2 preservation infos and 1 events." in result.output
+
+    rows = PreservationInfoModel.query.all()
+    assert sorted((row.revision_id, row.status.value) for row in rows) == [
+        (1, "P"),
+        (2, "I"),
+    ]
+    # The event still referenced by the latest preservation info is kept
+    assert {event.id for event in Event.query.all()} == {
+        events[1].id,
+        events[2].id,
+    }
+    latest = service.read(system_identity, "test_pid", latest=True).data
+    assert latest["revision_id"] == 2
@@ -8,6 +8,7 @@
 
 """Module tests."""
 
+import pytest
 from flask import Flask
 
 from invenio_preservation_sync import InvenioPreservationSync
@@ -35,3 +36,14 @@ def test_init():
     assert "invenio-preservation-sync" not in app.extensions
     ext.init_app(app)
     assert "invenio-preservation-sync" in app.extensions
+
+
+def test_init_write_buffer_too_large():
+    """Test the write buffer can't exceed the batch size."""
+    app = Flask("testapp")
+    app.config.update(
+        PRESERVATION_SYNC_WRITE_BUFFER_SIZE=20,
+        PRESERVATION_SYNC_BATCH_MAX_SIZE=10,
+    )
+    with pytest.raises(ValueError):
+        InvenioPreservationSync(app)
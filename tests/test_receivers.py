@@ -9,6 +9,16 @@
 """Receiver tests."""
 
 import json
+import time
+import uuid
+
+import pytest
+from invenio_webhooks.models import Event
+from invenio_webhooks.proxies import current_webhooks
+
+from invenio_preservation_sync.proxies import current_preservation_sync_service
+from invenio_preservation_sync.services.buffer import WriteBuffer
+from invenio_preservation_sync.tasks import process_event, shard
 
 
 def test_send_invalid_pid(app, client, archiver, access_token_headers):
@@ -107,3 +117,374 @@ def test_send_valid_minimal_event(app, client, archiver, access_token_headers):
     assert r.status_code == 200
     assert r.json["hits"]["total"] == 1
     assert r.json["hits"]["hits"][0]["status"] == "P"
+
+
+def test_send_batch_event(app, client, archiver, access_token_headers):
+    """Test batch of preservation events."""
+    client = archiver.login(client)
+
+    preservation = {
+        "pid": "test_pid",
+        "revision_id": "3",
+        "status": "I",
+        "archive_timestamp": "2024-09-01T18:34:18",
+    }
+    payload = json.dumps(
+        [
+            preservation,
+            dict(preservation, status="P"),
+            dict(preservation, status="P"),
+            {"pid": "not_existing_pid", "status": "P"},
+            {"pid": "test_pid", "status": "invalid"},
+        ]
+    )
+    r = client.post(
+        "hooks/receivers/preservation/events",
+        follow_redirects=True,
+        headers=access_token_headers,
+        data=payload,
+    )
+    assert r.status_code == 202
+    assert [hit["status"] for hit in r.json["hits"]] == [202, 202, 409, 404, 400]
+
+    r = client.get("/records/test_pid/preservations", headers=access_token_headers)
+    assert r.status_code == 200
+    assert r.json["hits"]["total"] == 1
+    assert r.json["hits"]["hits"][0]["status"] == "P"
+
+
+def test_send_batch_too_large(app, client, archiver, access_token_headers):
+    """Test batch exceeding the maximum size."""
+    client = archiver.login(client)
+
+    max_size = app.config["PRESERVATION_SYNC_BATCH_MAX_SIZE"]
+    payload = json.dumps([{"pid": "test_pid", "status": "P"}] * (max_size + 1))
+    r = client.post(
+        "hooks/receivers/preservation/events",
+        follow_redirects=True,
+        headers=access_token_headers,
+        data=payload,
+    )
+    assert r.status_code == 400
+
+
+def test_send_idempotent_event(app, db, client, archiver, access_token_headers):
+    """Test retries with an idempotency key replay the first response."""
+    current_preservation_sync_service.idempotency_cache.clear()
+    client = archiver.login(client)
+
+    def send(payload, headers=None):
+        return client.post(
+            "hooks/receivers/preservation/events",
+            follow_redirects=True,
+            headers={**access_token_headers, **(headers or {})},
+            data=json.dumps(payload),
+        )
+
+    payload = {
+        "pid": "test_pid",
+        "revision_id": 1,
+        "status": "P",
+        "archive_timestamp": "2024-09-01T18:34:18",
+    }
+    r = send(payload, {"Idempotency-Key": "delivery-1"})
+    assert r.status_code == 202
+    event_id = r.headers["X-Hub-Delivery"]
+
+    events = Event.query.count()
+    r = send(payload, {"Idempotency-Key": "delivery-1"})
+    assert r.status_code == 202
+    assert r.headers["X-Hub-Delivery"] == event_id
+    assert r.headers["Idempotent-Replayed"] == "true"
+    assert Event.query.count() == events
+
+    r = send(dict(payload, idempotency_key="delivery-2"))
+    assert r.status_code == 409
+    r = send(dict(payload, idempotency_key="delivery-2"))
+    assert r.status_code == 409
+    assert r.headers["Idempotent-Replayed"] == "true"
+    assert Event.query.count() == events + 1
+
+    # The key of another payload is rejected
+    r = send(dict(payload, revision_id=2), {"Idempotency-Key": "delivery-1"})
+    assert r.status_code == 422
+    assert Event.query.count() == events + 1
+
+    # Unresolved PIDs are not stored, so that the event can be retried
+    r = send(dict(payload, pid="unknown_pid"), {"Idempotency-Key": "delivery-3"})
+    assert r.status_code == 404
+    r = send(dict(payload, pid="unknown_pid"), {"Idempotency-Key": "delivery-3"})
+    assert r.status_code == 404
+    assert "Idempotent-Replayed" not in r.headers
+
+    # Retries of an event being processed are rejected
+    current_preservation_sync_service.idempotency_cache.add(
+        f"preservation-sync:idempotency:{archiver.id}:delivery-4",
+        {
+            "fingerprint": current_webhooks.receivers["preservation"]._fingerprint(
+                payload
+            )
+        },
+    )
+    events = Event.query.count()
+    r = send(payload, {"Idempotency-Key": "delivery-4"})
+    assert r.status_code == 409
+    assert "Idempotent-Replayed" not in r.headers
+    assert Event.query.count() == events
+
+    # Invalid payloads release their key
+    r = send({"pid": "test_pid"}, {"Idempotency-Key": "delivery-5"})
+    assert r.status_code == 400
+    r = send(dict(payload, revision_id=5), {"Idempotency-Key": "delivery-5"})
+    assert r.status_code == 202
+
+
+def test_idempotent_replay_not_validated(
+    app, db, client, archiver, access_token_headers, monkeypatch
+):
+    """Test replays return the stored response without validating the payload."""
+    current_preservation_sync_service.idempotency_cache.clear()
+    client = archiver.login(client)
+
+    def send():
+        return client.post(
+            "hooks/receivers/preservation/events",
+            follow_redirects=True,
+            headers={**access_token_headers, "Idempotency-Key": "delivery-replay"},
+            data=json.dumps(
+                {
+                    "pid": "test_pid",
+                    "revision_id": 4,
+                    "status": "P",
+                    "archive_timestamp": "2024-09-04T18:34:18",
+                }
+            ),
+        )
+
+    assert send().status_code == 202
+    receiver = current_webhooks.receivers["preservation"]
+    monkeypatch.setattr(receiver, "validate_payload", lambda payload: pytest.fail())
+    r = send()
+    assert r.status_code == 202
+    assert r.headers["Idempotent-Replayed"] == "true"
+
+
+def test_idempotent_response_ttl(
+    app, db, client, archiver, access_token_headers, monkeypatch
+):
+    """Test stored responses expire after the idempotency TTL."""
+    cache = current_preservation_sync_service.idempotency_cache
+    timeouts = []
+    set_ = cache.set
+    monkeypatch.setattr(
+        cache,
+        "set",
+        lambda key, value, timeout=None: timeouts.append(timeout)
+        or set_(key, value, timeout=timeout),
+    )
+    monkeypatch.setitem(app.config, "PRESERVATION_SYNC_IDEMPOTENCY_CACHE_TTL", 60)
+    client = archiver.login(client)
+
+    r = client.post(
+        "hooks/receivers/preservation/events",
+        follow_redirects=True,
+        headers={**access_token_headers, "Idempotency-Key": "delivery-ttl"},
+        data=json.dumps(
+            {
+                "pid": "test_pid",
+                "revision_id": 3,
+                "status": "P",
+                "archive_timestamp": "2024-09-03T18:34:18",
+            }
+        ),
+    )
+    assert r.status_code == 202
+    assert timeouts == [60]
+
+
+def test_send_async_event(app, db, client, archiver, access_token_headers, monkeypatch):
+    """Test events processed by a Celery task in async mode."""
+    monkeypatch.setitem(app.config, "PRESERVATION_SYNC_ASYNC", True)
+    client = archiver.login(client)
+
+    payload = {
+        "pid": "test_pid",
+        "revision_id": 1,
+        "status": "P",
+        "archive_timestamp": "2024-09-01T18:34:18",
+    }
+    r = client.post(
+        "hooks/receivers/preservation/events",
+        follow_redirects=True,
+        headers=access_token_headers,
+        data=json.dumps(payload),
+    )
+    assert r.status_code == 202
+    r = client.get("/records/test_pid/preservations", headers=access_token_headers)
+    assert r.json["hits"]["total"] == 1
+
+    # Outside of the request the task processes the event as its sender
+    event = Event(receiver_id="preservation", user_id=archiver.id, payload=payload)
+    db.session.add(event)
+    db.session.commit()
+    process_event.delay(str(event.id))
+    event = db.session.get(Event, event.id)
+    assert event.response_code == 409
+    assert event.response["status"] == 409
+
+    event = Event(receiver_id="preservation", payload=dict(payload, revision_id=2))
+    db.session.add(event)
+    db.session.commit()
+    process_event.delay(str(event.id))
+    event = db.session.get(Event, event.id)
+    assert event.response_code == 403
+
+
+def test_send_sharded_async_event(
+    app, client, archiver, access_token_headers, monkeypatch
+):
+    """Test async events are routed to the queue of their record."""
+    monkeypatch.setitem(app.config, "PRESERVATION_SYNC_ASYNC", True)
+    monkeypatch.setitem(app.config, "PRESERVATION_SYNC_ASYNC_SHARDS", 4)
+    queues = []
+    monkeypatch.setattr(
+        process_event, "apply_async", lambda args, queue: queues.append(queue)
+    )
+    client = archiver.login(client)
+
+    for payload in [
+        {"pid": "test_pid", "status": "I"},
+        [{"pid": "test_pid", "status": "P"}],
+        {"pid": "not_existing_pid", "status": "P"},
+    ]:
+        r = client.post(
+            "hooks/receivers/preservation/events",
+            follow_redirects=True,
+            headers=access_token_headers,
+            data=json.dumps(payload),
+        )
+        assert r.status_code == 202
+
+    object_uuid = current_preservation_sync_service.resolve_pid("test_pid")
+    queue = f"preservation-sync.{shard(object_uuid, 4)}"
+    assert queues == [queue, queue, "preservation-sync.0"]
+
+
+def test_send_sharded_async_batch(app, db, archiver, monkeypatch):
+    """Test async batches are split by the queue of the record of each item."""
+    monkeypatch.setitem(app.config, "PRESERVATION_SYNC_ASYNC_SHARDS", 4)
+    object_uuids = {f"shard_pid_{i}": uuid.UUID(int=i) for i in range(3)}
+    monkeypatch.setitem(
+        app.config,
+        "PRESERVATION_SYNC_PID_BATCH_RESOLVER",
+        lambda pids: {pid: object_uuids[pid] for pid in pids if pid in object_uuids},
+    )
+    payload = [
+        {"pid": "shard_pid_1", "revision_id": 1, "status": "I"},
+        {"pid": "shard_pid_2", "revision_id": 1, "status": "P"},
+        {"pid": "unknown_pid", "revision_id": 1, "status": "P"},
+        {"pid": "shard_pid_1", "revision_id": 2, "status": "P"},
+    ]
+    event = Event(receiver_id="preservation", user_id=archiver.id, payload=payload)
+    db.session.add(event)
+    db.session.commit()
+
+    routes = event.receiver.routes(event)
+    assert routes == [
+        ("preservation-sync.0", [2]),
+        ("preservation-sync.1", [0, 3]),
+        ("preservation-sync.2", [1]),
+    ]
+
+    # Each part writes its results to the event, in any order
+    for _, items in reversed(routes):
+        process_event.delay(str(event.id), items)
+    event = db.session.get(Event, event.id)
+    assert [hit["status"] for hit in event.response["hits"]] == [202, 202, 404, 202]
+
+    # A failing part only fails its own items
+    service = current_preservation_sync_service
+    create_or_update_many = service.create_or_update_many
+
+    def failing_create_or_update_many(identity, data, **kwargs):
+        if any(item["pid"] == "shard_pid_2" for item in data):
+            raise TimeoutError("The buffered write was not flushed in time.")
+        return create_or_update_many(identity, data, **kwargs)
+
+    monkeypatch.setattr(service, "create_or_update_many", failing_create_or_update_many)
+    event = Event(receiver_id="preservation", user_id=archiver.id, payload=payload)
+    db.session.add(event)
+    db.session.commit()
+    for _, items in routes:
+        process_event.delay(str(event.id), items)
+    event = db.session.get(Event, event.id)
+    assert event.response_code == 202
+    assert [hit["status"] for hit in event.response["hits"]] == [202, 503, 404, 202]
+
+
+def test_send_buffered_event(
+    app, db, client, archiver, access_token_headers, monkeypatch
+):
+    """Test events written through the write buffer."""
+    service = current_preservation_sync_service
+    write_buffer = WriteBuffer(service._flush_writes, max_size=10, max_delay=10)
+    monkeypatch.setattr(service, "write_buffer", write_buffer)
+    client = archiver.login(client)
+
+    payload = {
+        "pid": "test_pid",
+        "revision_id": 1,
+        "status": "P",
+        "archive_timestamp": "2024-09-01T18:34:18",
+    }
+    for status_code in (202, 409):
+        r = client.post(
+            "hooks/receivers/preservation/events",
+            follow_redirects=True,
+            headers=access_token_headers,
+            data=json.dumps(payload),
+        )
+        assert r.status_code == status_code
+    assert write_buffer.flushes == 2
+
+    # A write not flushed in time can be retried
+    write_buffer = WriteBuffer(
+        lambda items: time.sleep(0.2) or items, max_size=10, max_delay=0, timeout=0.05
+    )
+    monkeypatch.setattr(service, "write_buffer", write_buffer)
+    r = client.post(
+        "hooks/receivers/preservation/events",
+        follow_redirects=True,
+        headers=access_token_headers,
+        data=json.dumps(dict(payload, revision_id=2)),
+    )
+    assert r.status_code == 503
+
+
+def test_send_rejected_before_event(
+    app, db, client, archiver, access_token_headers, monkeypatch
+):
+    """Test invalid payloads are rejected without creating an event."""
+    receiver = current_webhooks.receivers["preservation"]
+    receiver.rejections.clear()
+    client = archiver.login(client)
+    events = Event.query.count()
+
+    def send(payload):
+        return client.post(
+            "hooks/receivers/preservation/events",
+            follow_redirects=True,
+            headers=access_token_headers,
+            data=json.dumps(payload),
+        )
+
+    assert send({"pid": "test_pid"}).status_code == 400
+    assert send({"pid": "test_pid", "status": "invalid"}).status_code == 400
+    assert send("test_pid").status_code == 400
+    monkeypatch.setitem(app.config, "PRESERVATION_SYNC_BATCH_MAX_SIZE", 1)
+    assert send([{"pid": "test_pid", "status": "P"}] * 2).status_code == 400
+    monkeypatch.setitem(app.config, "PRESERVATION_SYNC_ENABLED", False)
+    assert send({"pid": "test_pid", "status": "P"}).status_code == 404
+
+    assert Event.query.count() == events
+    assert receiver.rejections == {"invalid": 3, "batch_too_large": 1, "disabled": 1}
@@ -8,8 +8,13 @@
 
 """Resource endpoints tests."""
 
+import gzip
 import json
 
+from invenio_access.permissions import system_identity
+
+from invenio_preservation_sync.proxies import current_preservation_sync_service
+
 
 def test_permission_denied(app, client, headers):
     """Test permission denied on get request."""
@@ -130,3 +135,313 @@ def test_get_preservations(app, client, archiver, headers, access_token_headers)
     assert r.status_code == 200
     assert r.json["status"] == "F"
     assert r.json["revision_id"] == 2
+
+
+def test_get_preservations_paginated(app, db, client, archiver, headers):
+    """Test paginating the preservation infos of a record."""
+    client = archiver.login(client)
+    for revision_id in range(1, 4):
+        current_preservation_sync_service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "revision_id": revision_id, "status": "P"},
+        )
+
+    r = client.get("/records/test_pid/preservations?size=2", headers=headers)
+    assert r.status_code == 200
+    assert r.json["hits"]["total"] == 3
+    assert [h["revision_id"] for h in r.json["hits"]["hits"]] == [3, 2]
+    assert "page=2" in r.json["links"]["next"]
+
+    r = client.get("/records/test_pid/preservations?size=2&page=2", headers=headers)
+    assert [h["revision_id"] for h in r.json["hits"]["hits"]] == [1]
+    assert "next" not in r.json["links"]
+
+    revision_ids = []
+    url = "/records/test_pid/preservations?size=2&after="
+    while url:
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+        assert "total" not in r.json["hits"]
+        revision_ids.extend(h["revision_id"] for h in r.json["hits"]["hits"])
+        url = r.json["links"].get("next")
+    assert revision_ids == [3, 2, 1]
+
+    r = client.get("/records/test_pid/preservations?size=1000", headers=headers)
+    assert r.status_code == 400
+    r = client.get("/records/test_pid/preservations?after=invalid", headers=headers)
+    assert r.status_code == 400
+
+
+def test_get_latest_many(app, db, client, archiver, headers):
+    """Test getting the latest preservation info of many records."""
+    r = client.post(
+        "/preservations/latest", headers=headers, json={"pids": ["test_pid"]}
+    )
+    assert r.status_code == 403
+
+    client = archiver.login(client)
+    for revision_id, status in [(1, "I"), (2, "P")]:
+        current_preservation_sync_service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "revision_id": revision_id, "status": status},
+        )
+
+    r = client.post(
+        "/preservations/latest",
+        headers=headers,
+        json={"pids": ["test_pid", "not_existing_pid", "test_pid"]},
+    )
+    assert r.status_code == 200
+    assert r.json["hits"]["total"] == 1
+    hit = r.json["hits"]["hits"][0]
+    assert (hit["pid"], hit["status"], hit["revision_id"]) == ("test_pid", "P", 2)
+    assert [e["pid"] for e in r.json["errors"]] == ["not_existing_pid"]
+
+    r = client.post("/preservations/latest", headers=headers, json={})
+    assert r.status_code == 400
+
+
+def test_conditional_get(app, db, client, archiver, headers):
+    """Test the cache validators of the latest and list endpoints."""
+    client = archiver.login(client)
+    service = current_preservation_sync_service
+    service.create_or_update(system_identity, {"pid": "test_pid", "status": "I"})
+
+    etags = {}
+    for url in [
+        "/records/test_pid/preservations/latest",
+        "/records/test_pid/preservations",
+    ]:
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+        etag = etags[url] = r.headers["ETag"]
+        last_modified = r.headers["Last-Modified"]
+
+        r = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.headers["ETag"] == etag
+        assert not r.data
+        r = client.get(url, headers={**headers, "If-Modified-Since": last_modified})
+        assert r.status_code == 304
+        r = client.get(url, headers={**headers, "If-None-Match": '"other"'})
+        assert r.status_code == 200
+
+    service.create_or_update(system_identity, {"pid": "test_pid", "status": "P"})
+    for url, etag in etags.items():
+        r = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert r.status_code == 200
+        assert r.headers["ETag"] != etag
+
+
+def test_export(app, db, client, archiver, headers):
+    """Test exporting the preservation infos."""
+    r = client.get("/preservations/export")
+    assert r.status_code == 403
+
+    client = archiver.login(client)
+    for revision_id, status in [(1, "P"), (2, "F")]:
+        current_preservation_sync_service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "revision_id": revision_id, "status": status},
+        )
+
+    r = client.get("/preservations/export?status=F")
+    assert r.status_code == 200
+    assert r.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in r.data.splitlines()]
+    assert [(line["revision_id"], line["status"]) for line in lines] == [(2, "F")]
+
+    r = client.get("/preservations/export", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert len(gzip.decompress(r.data).splitlines()) == 2
+
+    r = client.get("/preservations/export?created_from=invalid")
+    assert r.status_code == 400
+
+
+def test_sparse_fieldsets(app, db, client, archiver, headers):
+    """Test narrowing the preservation infos to the requested fields."""
+    client = archiver.login(client)
+    for revision_id in range(1, 3):
+        current_preservation_sync_service.create_or_update(
+            system_identity,
+            {
+                "pid": "test_pid",
+                "revision_id": revision_id,
+                "status": "P",
+                "archive_timestamp": "2024-07-31T13:34:18",
+                "description": {"sip": {"files": 2}},
+            },
+        )
+    db.session.expunge_all()
+
+    r = client.get(
+        "/records/test_pid/preservations/latest?fields=status,archive_timestamp",
+        headers=headers,
+    )
+    assert r.status_code == 200
+    assert r.json == {"status": "P", "archive_timestamp": "2024-07-31T13:34:18+00:00"}
+
+    r = client.get(
+        "/records/test_pid/preservations?fields=revision_id&size=1", headers=headers
+    )
+    assert r.json["hits"]["hits"] == [{"revision_id": 2}]
+    assert "fields=revision_id" in r.json["links"]["next"]
+
+    r = client.post(
+        "/preservations/latest?fields=description",
+        headers=headers,
+        json={"pids": ["test_pid"]},
+    )
+    assert r.json["hits"]["hits"] == [
+        {"description": {"sip": {"files": 2}}, "pid": "test_pid"}
+    ]
+
+    r = client.get(
+        "/records/test_pid/preservations/latest?fields=status,unknown",
+        headers=headers,
+    )
+    assert r.status_code == 400
+
+
+def test_get_stats(app, db, client, archiver, headers):
+    """Test counting the preservation infos of each status."""
+    service = current_preservation_sync_service
+    service.stats_cache.clear()
+    client = archiver.login(client)
+
+    r = client.get("/preservations/stats", headers=headers)
+    assert r.status_code == 200
+    assert r.json == {"status": {"P": 0, "I": 0, "F": 0, "D": 0}, "total": 0}
+
+    for revision_id, status in [(1, "I"), (2, "F"), (3, "P")]:
+        service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "revision_id": revision_id, "status": status},
+        )
+
+    r = client.get("/preservations/stats", headers=headers)
+    assert r.json == {"status": {"P": 1, "I": 1, "F": 1, "D": 0}, "total": 3}
+    r = client.get("/preservations/stats?latest=true", headers=headers)
+    assert r.json == {"status": {"P": 1, "I": 0, "F": 0, "D": 0}, "total": 1}
+
+    client.get("/preservations/stats", headers=headers)
+    assert service.stats_cache.hits == 1
+
+
+def test_search(app, db, client, archiver, headers):
+    """Test searching the preservation infos of all the records."""
+    r = client.get("/preservations", headers=headers)
+    assert r.status_code == 403
+
+    client = archiver.login(client)
+    service = current_preservation_sync_service
+    for revision_id, status, archive_timestamp in [
+        (1, "F", "2024-07-01T10:00:00"),
+        (2, "F", "2024-07-08T10:00:00"),
+        (3, "F", "2024-07-09T10:00:00"),
+        (4, "P", "2024-07-10T10:00:00"),
+    ]:
+        service.create_or_update(
+            system_identity,
+            {
+                "pid": "test_pid",
+                "revision_id": revision_id,
+                "status": status,
+                "archive_timestamp": archive_timestamp,
+            },
+        )
+
+    revision_ids = []
+    url = (
+        "/preservations?status=F&size=1"
+        "&archived_from=2024-07-07T00:00:00&archived_to=2024-07-14T00:00:00"
+    )
+    while url:
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+        assert all(hit["status"] == "F" for hit in r.json["hits"]["hits"])
+        assert all("object_uuid" in hit for hit in r.json["hits"]["hits"])
+        revision_ids.extend(hit["revision_id"] for hit in r.json["hits"]["hits"])
+        url = r.json["links"].get("next")
+    assert revision_ids == [3, 2]
+
+    r = client.get("/preservations?revision_id=4&status=P&status=F", headers=headers)
+    assert [hit["revision_id"] for hit in r.json["hits"]["hits"]] == [4]
+
+    r = client.get("/preservations?status=X", headers=headers)
+    assert r.status_code == 400
+
+
+def test_get_changes(app, db, client, archiver, headers, monkeypatch):
+    """Test tailing the preservation infos created or updated."""
+    monkeypatch.setitem(app.config, "PRESERVATION_SYNC_CHANGES_DELAY", 0)
+    client = archiver.login(client)
+    service = current_preservation_sync_service
+
+    def write(revision_id, status):
+        service.create_or_update(
+            system_identity,
+            {
+                "pid": "test_pid",
+                "revision_id": revision_id,
+                "status": status,
+                "archive_timestamp": "2024-07-31T13:34:18",
+            },
+        )
+
+    def poll(url):
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+        hits = [(h["revision_id"], h["status"]) for h in r.json["hits"]["hits"]]
+        return hits, r.json["links"]["next"]
+
+    for revision_id in range(1, 4):
+        write(revision_id, "I")
+
+    hits, url = poll("/preservations/changes?size=2")
+    assert hits == [(1, "I"), (2, "I")]
+    hits, url = poll(url)
+    assert hits == [(3, "I")]
+    hits, next_url = poll(url)
+    assert hits == []
+    assert next_url == url
+
+    write(1, "P")
+    hits, url = poll(url)
+    assert hits == [(1, "P")]
+
+    r = client.get("/preservations/changes?after=invalid", headers=headers)
+    assert r.status_code == 400
+
+
+def test_search_description(app, db, client, archiver, headers):
+    """Test filtering the preservation infos on their description."""
+    client = archiver.login(client)
+    for revision_id, description in [
+        (1, {"compliance": "OAIS", "sender": {"name": "archive"}}),
+        (2, {"compliance": "none", "sender": {"name": "archive"}}),
+        (3, None),
+    ]:
+        current_preservation_sync_service.create_or_update(
+            system_identity,
+            {
+                "pid": "test_pid",
+                "revision_id": revision_id,
+                "status": "P",
+                "description": description,
+            },
+        )
+
+    def search(query):
+        r = client.get(f"/preservations?{query}", headers=headers)
+        assert r.status_code == 200
+        return sorted(hit["revision_id"] for hit in r.json["hits"]["hits"])
+
+    assert search("description.compliance=OAIS") == [1]
+    assert search("description.sender.name=archive") == [1, 2]
+    assert search("description.sender.name=archive&description.compliance=none") == [2]
+    assert search("description.sender=archive") == []
+
+    r = client.get('/preservations?description.a"b=x', headers=headers)
+    assert r.status_code == 400
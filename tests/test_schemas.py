@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Schemas tests."""
+
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from marshmallow import Schema, fields, post_dump
+
+from invenio_preservation_sync.models import PreservationInfoModel
+from invenio_preservation_sync.services.schemas import (
+    PreservationInfoExportSchema,
+    PreservationInfoSchema,
+    compile_dump,
+)
+
+
+def _preservation(**kwargs):
+    """Return a transient preservation info."""
+    data = dict(
+        id=uuid.uuid4(),
+        object_uuid=uuid.uuid4(),
+        created=datetime(2024, 7, 31, 13, 34, 18, 123456),
+        updated=datetime(2024, 8, 1, 9, 0),
+        revision_id=3,
+        status=PreservationInfoModel._convert_status("p"),
+        harvest_timestamp=datetime(2024, 7, 30),
+        archive_timestamp=datetime(2024, 7, 31, 13, 34, 18, tzinfo=timezone.utc),
+        uri="https://archive.org/a",
+        path="/a",
+        description={"sip": {"files": 2}},
+        event_id=uuid.uuid4(),
+    )
+    data.update(kwargs)
+    return PreservationInfoModel(**data)
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [
+        PreservationInfoSchema(),
+        PreservationInfoExportSchema(),
+        PreservationInfoSchema(only=("status", "uri")),
+    ],
+)
+@pytest.mark.parametrize(
+    "obj",
+    [
+        _preservation(),
+        _preservation(
+            revision_id=None,
+            harvest_timestamp=None,
+            archive_timestamp=None,
+            uri=None,
+            path=None,
+            description=None,
+            event_id=None,
+        ),
+    ],
+)
+def test_compile_dump_parity(schema, obj):
+    """Test the compiled dump has the same output as the schema."""
+    assert compile_dump(schema)(obj) == schema.dump(obj)
+
+
+def test_compile_dump_fallback():
+    """Test schemas and fields without a fast path are dumped by marshmallow."""
+
+    class HookSchema(Schema):
+        uri = fields.String()
+
+        @post_dump
+        def upper(self, data, **kwargs):
+            return {key: value.upper() for key, value in data.items()}
+
+    schema = HookSchema()
+    assert compile_dump(schema) == schema.dump
+
+    class FallbackSchema(Schema):
+        link = fields.Url(attribute="uri")
+        revision = fields.Integer(attribute="revision_id", as_string=True)
+        missing = fields.String(dump_default="default")
+
+    schema = FallbackSchema()
+    obj = _preservation()
+    assert compile_dump(schema)(obj) == schema.dump(obj)
@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Service tests."""
+
+import threading
+import time
+
+import pytest
+from invenio_access.permissions import system_identity
+from invenio_pidstore.errors import PIDDoesNotExistError
+from marshmallow import ValidationError
+from sqlalchemy import inspect
+from sqlalchemy.exc import DataError
+
+from invenio_preservation_sync.errors import (
+    PreservationAlreadyReceivedError,
+    PreservationInfoNotFoundError,
+)
+from invenio_preservation_sync.models import (
+    PreservationInfoLatestModel,
+    PreservationInfoModel,
+)
+from invenio_preservation_sync.proxies import current_preservation_sync_service
+from invenio_preservation_sync.services.buffer import WriteBuffer
+
+
+def test_resolve_pid_cache(app):
+    """Test resolved and unresolved pids are cached."""
+    service = current_preservation_sync_service
+    service.pid_cache.clear()
+
+    object_uuid = service.resolve_pid("test_pid")
+    assert service.resolve_pid("test_pid") == object_uuid
+    assert (service.pid_cache.hits, service.pid_cache.misses) == (1, 1)
+
+    for _ in range(2):
+        with pytest.raises(PIDDoesNotExistError):
+            service.resolve_pid("not_existing_pid")
+    assert (service.pid_cache.hits, service.pid_cache.misses) == (2, 2)
+
+
+def test_resolve_pids_batch_resolver(app, monkeypatch):
+    """Test resolving many pids with the batch resolver."""
+    service = current_preservation_sync_service
+    service.pid_cache.clear()
+
+    calls = []
+
+    def batch_resolver(pids):
+        calls.append(sorted(pids))
+        return {pid: service.pid_resolver(pid) for pid in pids if pid == "test_pid"}
+
+    monkeypatch.setitem(
+        app.config, "PRESERVATION_SYNC_PID_BATCH_RESOLVER", batch_resolver
+    )
+
+    pids = ["test_pid", "not_existing_pid", "test_pid"]
+    object_uuids = service.resolve_pids(pids)
+    assert list(object_uuids) == ["test_pid"]
+    assert service.resolve_pids(pids) == object_uuids
+    assert calls == [["not_existing_pid", "test_pid"]]
+
+
+def test_create_or_update_upsert(app, db):
+    """Test creating, updating and receiving again a preservation info."""
+    service = current_preservation_sync_service
+    data = {
+        "pid": "test_pid",
+        "revision_id": 1,
+        "status": "I",
+        "archive_timestamp": "2024-07-31T13:34:18",
+    }
+
+    created = service.create_or_update(system_identity, data)._obj
+    with pytest.raises(PreservationAlreadyReceivedError):
+        service.create_or_update(system_identity, data)
+
+    updated = service.create_or_update(system_identity, dict(data, status="P"))._obj
+    assert updated.id == created.id
+    assert updated.status == "P"
+    assert len(service.read(system_identity, "test_pid").to_dict()["hits"]["hits"]) == 1
+
+
+def test_create_or_update_many_offset_timestamp(app, db):
+    """Test batch items with an UTC offset match their stored preservation info."""
+    service = current_preservation_sync_service
+    payload = {
+        "pid": "test_pid",
+        "revision_id": 1,
+        "status": "I",
+        "archive_timestamp": "2024-07-31T13:34:18+02:00",
+    }
+    results = service.create_or_update_many(system_identity, [payload])
+    assert results[0]["status"] == 202
+
+    results = service.create_or_update_many(
+        system_identity, [payload, dict(payload, status="P")]
+    )
+    assert [result["status"] for result in results] == [409, 202]
+    hits = service.read(system_identity, "test_pid").to_dict()["hits"]["hits"]
+    assert [hit["status"] for hit in hits] == ["P"]
+    assert hits[0]["archive_timestamp"].startswith("2024-07-31T11:34:18")
+
+    # The single writes match it too
+    with pytest.raises(PreservationAlreadyReceivedError):
+        service.create_or_update(system_identity, dict(payload, status="P"))
+
+
+def test_create_or_update_many_revision_zero(app, db):
+    """Test the first revision of a record is matched like the others."""
+    service = current_preservation_sync_service
+    payload = {
+        "pid": "test_pid",
+        "revision_id": 0,
+        "status": "I",
+        "archive_timestamp": "2024-07-31T11:34:18",
+    }
+    service.create_or_update_many(system_identity, [payload])
+    results = service.create_or_update_many(
+        system_identity, [dict(payload, status="P")]
+    )
+    assert results[0]["status"] == 202
+    hits = service.read(system_identity, "test_pid").to_dict()["hits"]["hits"]
+    assert [(hit["revision_id"], hit["status"]) for hit in hits] == [(0, "P")]
+
+
+def test_read_latest_missing_cache(app, db):
+    """Test records without preservation info are cached until the first create."""
+    service = current_preservation_sync_service
+    service.missing_cache.clear()
+
+    for _ in range(2):
+        with pytest.raises(PreservationInfoNotFoundError):
+            service.read(system_identity, "test_pid", latest=True)
+    assert (service.missing_cache.hits, service.missing_cache.misses) == (1, 1)
+
+    service.create_or_update(system_identity, {"pid": "test_pid", "status": "P"})
+    latest = service.read(system_identity, "test_pid", latest=True).to_dict()
+    assert latest["status"] == "P"
+    assert len(service.missing_cache) == 0
+
+
+def test_missing_cache_shared_backend(app, db, monkeypatch):
+    """Test a shared missing cache gets the configured timeout and deletions."""
+
+    class SharedCache(dict):
+        def get(self, key):
+            return super().get(key, (None,))[0]
+
+        def set(self, key, value, timeout=None):
+            self[key] = (value, timeout)
+
+        def delete(self, key):
+            return self.pop(key, None) is not None
+
+    service = current_preservation_sync_service
+    cache = SharedCache()
+    monkeypatch.setattr(service, "missing_cache", cache)
+    object_uuid = service.resolve_pid("test_pid")
+
+    with pytest.raises(PreservationInfoNotFoundError):
+        service.read(system_identity, "test_pid", latest=True)
+    ttl = app.config["PRESERVATION_SYNC_MISSING_CACHE_TTL"]
+    assert list(cache.values()) == [(True, ttl)]
+
+    service.forget_missing([object_uuid])
+    assert cache == {}
+
+
+def test_read_fields_defers_description(app, db):
+    """Test the description column is only loaded when requested."""
+    service = current_preservation_sync_service
+    service.create_or_update(
+        system_identity,
+        {"pid": "test_pid", "status": "P", "description": {"sip": {"files": 2}}},
+    )
+    db.session.expunge_all()
+
+    preservation = service.read(
+        system_identity, "test_pid", latest=True, fields=["status"]
+    )
+    assert preservation.to_dict() == {"status": "P"}
+    assert "description" in inspect(preservation._obj).unloaded
+
+    db.session.expunge_all()
+    preservations = service.read(system_identity, "test_pid", fields=["description"])
+    assert preservations.to_dict()["hits"]["hits"] == [
+        {"description": {"sip": {"files": 2}}}
+    ]
+
+
+def test_search_keyset_same_created(app, db):
+    """Test the keyset pages don't skip the rows created with the cursor row."""
+    service = current_preservation_sync_service
+    for revision_id in range(3):
+        service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "revision_id": revision_id, "status": "P"},
+        )
+    rows = PreservationInfoModel.query.all()
+    for row in rows:
+        row.created = rows[0].created
+    db.session.commit()
+
+    expected = sorted((row.id for row in rows), reverse=True)
+    ids, after = [], None
+    while True:
+        page = PreservationInfoModel.search(after=after, size=1)
+        if not page:
+            break
+        ids.append(page[0].id)
+        after = (page[0].created, page[0].id)
+    assert ids == expected
+
+
+def test_create_or_update_payload_hash(app, db):
+    """Test duplicates are detected with the payload fingerprint."""
+    service = current_preservation_sync_service
+    data = {
+        "pid": "test_pid",
+        "revision_id": 1,
+        "status": "P",
+        "archive_timestamp": "2024-07-31T13:34:18",
+        "harvest_timestamp": "2024-07-31T12:00:00",
+        "description": {"b": 1, "a": [1, 2]},
+    }
+    preservation = service.create_or_update(system_identity, data)._obj
+    payload_hash = preservation.payload_hash
+    assert len(payload_hash) == 64
+
+    with pytest.raises(PreservationAlreadyReceivedError):
+        service.create_or_update(
+            system_identity,
+            dict(
+                data,
+                harvest_timestamp="2024-07-31T14:00:00+02:00",
+                description={"a": [1, 2], "b": 1},
+            ),
+        )
+
+    # Preservation infos received before the fingerprint was stored
+    preservation.payload_hash = None
+    db.session.commit()
+    with pytest.raises(PreservationAlreadyReceivedError):
+        service.create_or_update(system_identity, data)
+    results = service.create_or_update_many(system_identity, [data])
+    assert results[0]["status"] == 409
+
+    updated = service.create_or_update(system_identity, dict(data, uri="a"))._obj
+    assert updated.payload_hash not in (None, payload_hash)
+
+
+def test_write_buffer(app):
+    """Test concurrent writes are flushed together."""
+    batches = []
+
+    def flush(items):
+        if "fail" in items:
+            raise ValueError("Flush failed.")
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    write_buffer = WriteBuffer(flush, max_size=3, max_delay=5000)
+    results = {}
+
+    def submit(item):
+        with app.app_context():
+            results[item] = write_buffer.submit(item)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [sorted(batch) for batch in batches] == [[1, 2, 3]]
+    assert results == {1: 2, 2: 4, 3: 6}
+
+    # A lone write is flushed after the delay
+    write_buffer.max_delay = 10
+    assert write_buffer.submit(4) == 8
+    assert batches[-1] == [4]
+
+    with pytest.raises(ValueError):
+        write_buffer.submit("fail")
+    assert write_buffer.flushes == 3
+
+    # A failing write doesn't fail the others flushed with it
+    write_buffer.max_delay = 5000
+    threads = [threading.Thread(target=submit, args=(i,)) for i in (5, 6)]
+    for thread in threads:
+        thread.start()
+    with pytest.raises(ValueError):
+        write_buffer.submit("fail")
+    for thread in threads:
+        thread.join()
+    assert results[5] == 10 and results[6] == 12
+    assert sorted(batches[-2:]) == [[5], [6]]
+
+
+def test_write_buffer_timeout(app):
+    """Test a write not flushed in time fails and is dropped from the buffer."""
+    flushing = threading.Event()
+    release = threading.Event()
+
+    def flush(items):
+        flushing.set()
+        release.wait()
+        return items
+
+    write_buffer = WriteBuffer(flush, max_size=1, max_delay=0, timeout=0.1)
+    with pytest.raises(TimeoutError):
+        write_buffer.submit(1)
+    assert flushing.is_set()
+    # Submitted while the first write is still being flushed
+    with pytest.raises(TimeoutError):
+        write_buffer.submit(2)
+    release.set()
+    time.sleep(0.1)
+    assert write_buffer.flushes == 1
+
+
+def test_create_or_update_buffered(app, db, monkeypatch):
+    """Test writing through the write buffer."""
+    service = current_preservation_sync_service
+    write_buffer = WriteBuffer(service._flush_writes, max_size=3, max_delay=10)
+    monkeypatch.setattr(service, "write_buffer", write_buffer)
+    payload = {
+        "pid": "test_pid",
+        "revision_id": 1,
+        "status": "P",
+        "archive_timestamp": "2024-09-01T18:34:18",
+    }
+
+    result = service.create_or_update_buffered(system_identity, payload)
+    assert result["status"] == 202
+    assert service.read(system_identity, "test_pid").total == 1
+    result = service.create_or_update_buffered(system_identity, payload)
+    assert result["status"] == 409
+    assert write_buffer.flushes == 2
+
+    # Invalid payloads are rejected before being buffered
+    with pytest.raises(ValidationError):
+        service.create_or_update_buffered(system_identity, {"pid": "test_pid"})
+    assert write_buffer.flushes == 2
+
+
+def test_create_or_update_buffered_failure(app, database, monkeypatch):
+    """Test a write failing in the database doesn't fail the others.
+
+    Uses the ``database`` fixture, as the writes are committed by the flushing
+    thread, and deletes the committed preservation infos itself.
+    """
+    if database.engine.dialect.name == "sqlite":
+        pytest.skip("SQLite doesn't enforce the length of the columns.")
+    service = current_preservation_sync_service
+    object_uuid = service.resolve_pid("test_pid")
+    write_buffer = WriteBuffer(service._flush_writes, max_size=2, max_delay=5000)
+    monkeypatch.setattr(service, "write_buffer", write_buffer)
+    payload = {
+        "pid": "test_pid",
+        "status": "P",
+        "archive_timestamp": "2024-09-01T18:34:18",
+    }
+    results = {}
+
+    def submit(revision_id, uri):
+        with app.app_context():
+            results[revision_id] = service.create_or_update_buffered(
+                system_identity, dict(payload, revision_id=revision_id, uri=uri)
+            )
+
+    thread = threading.Thread(target=submit, args=(2, "https://archive.org/2"))
+    try:
+        thread.start()
+        with pytest.raises(DataError):
+            submit(3, "https://archive.org/" + "x" * 255)
+        thread.join()
+        assert results[2]["status"] == 202
+        assert service.read(system_identity, "test_pid").total == 1
+        assert write_buffer.flushes == 3
+    finally:
+        database.session.rollback()
+        PreservationInfoLatestModel.query.filter_by(object_uuid=object_uuid).delete()
+        PreservationInfoModel.query.filter_by(object_uuid=object_uuid).delete()
+        database.session.commit()
+
+
+def test_create_or_update_concurrent(app, database):
+    """Stress test the concurrent writes of the preservation infos of a record.
+
+    Uses the ``database`` fixture, so that each thread has its own connection,
+    and deletes the committed preservation infos itself.
+    """
+    if database.engine.dialect.name != "postgresql":
+        pytest.skip("The records are only locked on PostgreSQL.")
+    service = current_preservation_sync_service
+    object_uuid = service.resolve_pid("test_pid")
+    errors = []
+
+    def write(worker):
+        with app.app_context():
+            for revision_id in range(10):
+                payload = {
+                    "pid": "test_pid",
+                    "revision_id": revision_id,
+                    "status": "PIF"[(worker + revision_id) % 3],
+                    "archive_timestamp": "2024-09-01T18:34:18",
+                }
+                try:
+                    if revision_id % 2:
+                        result = service.create_or_update_many(
+                            system_identity, [payload]
+                        )[0]
+                        assert result["status"] in (202, 409), result
+                    else:
+                        service.create_or_update(system_identity, payload)
+                except PreservationAlreadyReceivedError:
+                    pass
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+        rows = (
+            PreservationInfoModel.query.filter_by(object_uuid=object_uuid)
+            .order_by(*PreservationInfoModel.latest_order_by())
+            .all()
+        )
+        assert sorted(row.revision_id for row in rows) == list(range(10))
+        latest = database.session.get(PreservationInfoLatestModel, object_uuid)
+        assert latest.preservation_id == rows[0].id
+    finally:
+        database.session.rollback()
+        PreservationInfoLatestModel.query.filter_by(object_uuid=object_uuid).delete()
+        PreservationInfoModel.query.filter_by(object_uuid=object_uuid).delete()
+        database.session.commit()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 CERN.
+#
+# Invenio-Preservation-Sync is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Utils tests."""
+
+import uuid
+from types import SimpleNamespace
+
+from flask import g
+from flask_principal import Identity
+from invenio_access.permissions import any_user, superuser_access, system_identity
+
+from invenio_preservation_sync.proxies import current_preservation_sync_service
+from invenio_preservation_sync.utils import preservation_info_render
+
+
+def test_preservation_info_render(app, db, archiver_role_need):
+    """Test rendering and caching the preservation info of a record."""
+    service = current_preservation_sync_service
+    service.render_cache.clear()
+    service.missing_cache.clear()
+    record = SimpleNamespace(
+        # The record is resolved from its PID, not its own identifier
+        _record=SimpleNamespace(
+            id=uuid.uuid4(),
+            pid=SimpleNamespace(pid_value="test_pid"),
+        )
+    )
+    archiver = Identity(1)
+    archiver.provides.update([any_user, archiver_role_need])
+
+    with app.test_request_context():
+        g.identity = archiver
+        assert preservation_info_render(record) == []
+        assert preservation_info_render(record) == []
+        assert service.missing_cache.hits == 1
+
+        service.create_or_update(system_identity, {"pid": "test_pid", "status": "P"})
+        entries = preservation_info_render(record)
+        assert len(entries) == 1
+        assert entries[0]["content"]["url"] is None
+        preservation_info_render(record)
+        assert service.render_cache.hits == 1
+
+        service.create_or_update(
+            system_identity,
+            {"pid": "test_pid", "status": "P", "uri": "https://archive.org/a"},
+        )
+        superuser = Identity(2)
+        superuser.provides.update([any_user, archiver_role_need, superuser_access])
+        g.identity = superuser
+        entries = preservation_info_render(record)
+        assert entries[0]["content"]["url"] == "https://archive.org/a"